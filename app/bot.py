@@ -1,16 +1,28 @@
 import asyncio
+from collections.abc import Callable
 from pathlib import Path
 
 from aiogram import Dispatcher
 from aiogram.types import BotCommand
 from loguru import logger
 
-from app.core.config_aiogram import aiogram_bot
+from app.core.config_aiogram import aiogram_bot, bulk_bot, config_aiogram
 from app.core.logging_config import setup_logging
 from app.data.deep_links_loader import load_deep_links
-from app.data.loader import load_sections
+from app.data.loader import get_snapshot, load_sections
+from app.data.watcher import content_watcher
 from app.database import init_db
+from app.database.fsm_storage import SqliteStorage
 from app.handlers import router
+from app.middlewares import setup_update_lanes
+from app.utils.broadcast import broadcast_worker
+from app.utils.image_variants import image_variants, snapshot_images
+from app.utils.media_groups import media_group_store
+from app.utils.metrics import metrics_server, setup_metrics
+from app.utils.profiler import ProfilerMiddleware
+from app.utils.stats import user_stats
+from app.utils.user_registry import user_registry
+from app.webhook import run_webhook
 
 
 async def set_commands() -> None:
@@ -23,6 +35,54 @@ async def set_commands() -> None:
     )
 
 
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=SqliteStorage())
+    setup_update_lanes(dp, config_aiogram.concurrency)
+    dp.update.outer_middleware(ProfilerMiddleware())
+    dp.include_router(router)
+    return dp
+
+
+async def start_metrics(dp: Dispatcher, port_offset: int = 0) -> None:
+    """Collect handler/Bot API metrics and serve them when METRICS_PORT is set."""
+    settings = config_aiogram.metrics
+    if not settings.enabled:
+        return
+    setup_metrics(dp, aiogram_bot, bulk_bot)
+    await metrics_server.start(settings.host, settings.port + port_offset)
+
+
+async def start_services(primary: bool = True, owns_chat: Callable[[int], bool] | None = None) -> None:
+    """
+    Start background services of an update-handling process. Only the primary process runs
+    broadcasts and counter reconciliation; owns_chat limits the user index to the process shard.
+    """
+    await user_registry.warm(owns_chat)
+    await media_group_store.load()
+    await user_stats.refresh()
+    if primary and not user_stats.total:
+        await user_stats.reconcile()
+    user_registry.start()
+    user_stats.start(reconcile=primary)
+    # варианты картинок собирает только главный процесс, остальные берут готовые файлы из кэша
+    image_variants.start(config_aiogram.images, build=primary)
+    image_variants.schedule(snapshot_images(get_snapshot()))
+    content_watcher.start()
+    if primary:
+        broadcast_worker.start(bulk_bot)
+
+
+async def stop_services() -> None:
+    await content_watcher.stop()
+    await image_variants.stop()
+    await broadcast_worker.stop()
+    await user_registry.stop()
+    await user_stats.stop()
+    await metrics_server.stop()
+    if bulk_bot is not aiogram_bot:
+        await bulk_bot.session.close()
+
+
 async def main() -> None:
     setup_logging()
     Path("data").mkdir(exist_ok=True)
@@ -30,10 +90,25 @@ async def main() -> None:
     load_deep_links()
     await init_db()
     await set_commands()
-    dp = Dispatcher()
-    dp.include_router(router)
-    logger.info("Бот запускает long polling")
-    await dp.start_polling(aiogram_bot)
+    if config_aiogram.workers > 1:
+        from app.workers import run_supervisor
+
+        await run_supervisor(config_aiogram.workers)
+        return
+    dp = create_dispatcher()
+    await start_metrics(dp)
+    await start_services()
+    try:
+        if config_aiogram.webhook.enabled:
+            await run_webhook(dp, aiogram_bot)
+        else:
+            # getUpdates не работает, пока установлен webhook
+            await aiogram_bot.delete_webhook()
+            logger.info("Бот запускает long polling")
+            await dp.start_polling(aiogram_bot)
+    finally:
+        await stop_services()
+        await logger.complete()
 
 
 if __name__ == "__main__":
@@ -1,20 +1,185 @@
+import secrets
 from pathlib import Path
 
 from environs import Env
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 from aiogram.enums import ParseMode
 
+from app.core.http_session import TunedAiohttpSession
+
+# Значения по умолчанию (общие для load_config и Config без явных настроек)
+DEFAULT_BOT_API_POOL_SIZE = 100
+DEFAULT_BOT_API_BULK_POOL_SIZE = 16
+DEFAULT_BOT_API_KEEPALIVE = 30.0
+DEFAULT_BOT_API_DNS_CACHE_TTL = 3600
+DEFAULT_BOT_API_TIMEOUT = 60.0
+DEFAULT_IMAGE_MAX_SIZE = 2560
+DEFAULT_IMAGE_FORMAT = "jpeg"
+DEFAULT_IMAGE_QUALITY = 85
+DEFAULT_IMAGE_CACHE_DIR = "data/image_cache"
+DEFAULT_IMAGE_WORKERS = 2
+
+# Таймауты по умолчанию для отдельных методов Bot API (секунды); остальные — BOT_API_TIMEOUT
+DEFAULT_METHOD_TIMEOUTS = {
+    "answerCallbackQuery": 10.0,
+    "sendPhoto": 120.0,
+    "sendMediaGroup": 120.0,
+    "sendDocument": 300.0,
+    "editMessageMedia": 120.0,
+}
+
 
 class TgBot:
     def __init__(self, token: str):
         self.token = token
 
 
+class Webhook:
+    """Webhook mode settings; mode is "polling" (default) or "webhook"."""
+
+    def __init__(
+        self,
+        mode: str,
+        url: str,
+        path: str,
+        secret: str,
+        host: str,
+        port: int,
+        max_connections: int,
+    ):
+        self.mode = mode
+        self.url = url.rstrip("/")
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "webhook"
+
+    def secret_token(self) -> str:
+        """
+        Secret for X-Telegram-Bot-Api-Secret-Token. Without WEBHOOK_SECRET a random one is generated, which
+        only works with WEBHOOK_URL (Telegram gets it in setWebhook); local testing needs WEBHOOK_SECRET.
+        """
+        if self.secret:
+            return self.secret
+        if not self.url:
+            raise ValueError("WEBHOOK_SECRET обязателен в режиме webhook без WEBHOOK_URL (локальная проверка)")
+        return secrets.token_urlsafe(32)
+
+
+class Metrics:
+    """Prometheus endpoint settings; port 0 disables it. With BOT_WORKERS > 1 worker i serves on port + i."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    @property
+    def enabled(self) -> bool:
+        return self.port > 0
+
+
+class BotApi:
+    """
+    Bot API HTTP settings: separate connection pools for interactive traffic and broadcasts,
+    keep-alive, DNS cache, timeouts and an optional local Bot API server URL.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        local: bool,
+        pool_size: int,
+        bulk_pool_size: int,
+        keepalive: float,
+        dns_cache_ttl: int,
+        timeout: float,
+        method_timeouts: dict[str, float],
+    ):
+        self.url = url.rstrip("/")
+        self.local = local
+        self.pool_size = max(1, pool_size)
+        self.bulk_pool_size = max(0, bulk_pool_size)
+        self.keepalive = keepalive
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self.method_timeouts = {**DEFAULT_METHOD_TIMEOUTS, **method_timeouts}
+
+    @property
+    def server(self) -> TelegramAPIServer:
+        return TelegramAPIServer.from_base(self.url, is_local=self.local) if self.url else PRODUCTION
+
+    def create_session(self, bulk: bool = False) -> TunedAiohttpSession:
+        return TunedAiohttpSession(
+            limit=self.bulk_pool_size if bulk else self.pool_size,
+            keepalive_timeout=self.keepalive,
+            dns_cache_ttl=self.dns_cache_ttl,
+            timeout=self.timeout,
+            method_timeouts=self.method_timeouts,
+            api=self.server,
+        )
+
+
+class Images:
+    """
+    Preprocessing of local section images: longest side up to max_size, JPEG or WebP with quality,
+    EXIF removed; variants are cached in cache_dir by content hash. max_size 0 sends originals as is.
+    """
+
+    def __init__(self, max_size: int, image_format: str, quality: int, cache_dir: str, workers: int):
+        self.max_size = max(0, max_size)
+        self.format = image_format if image_format in ("jpeg", "webp") else "jpeg"
+        self.quality = min(max(quality, 1), 100)
+        self.cache_dir = Path(cache_dir)
+        self.workers = max(1, workers)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+
 class Config:
-    def __init__(self, tg_bot: TgBot, admin_id: str):
+    def __init__(
+        self,
+        tg_bot: TgBot,
+        admin_id: str,
+        webhook: Webhook,
+        workers: int = 1,
+        concurrency: int = 64,
+        metrics: Metrics | None = None,
+        bot_api: BotApi | None = None,
+        images: Images | None = None,
+    ):
         self.tg_bot = tg_bot
         self.admin_ids = [x.strip() for x in admin_id.split(",") if x.strip()]
+        self.webhook = webhook
+        self.workers = max(1, workers)
+        # сколько обновлений один процесс обрабатывает одновременно (разных чатов)
+        self.concurrency = max(1, concurrency)
+        self.metrics = metrics or Metrics(host="127.0.0.1", port=0)
+        self.bot_api = bot_api or BotApi(
+            url="",
+            local=False,
+            pool_size=DEFAULT_BOT_API_POOL_SIZE,
+            bulk_pool_size=DEFAULT_BOT_API_BULK_POOL_SIZE,
+            keepalive=DEFAULT_BOT_API_KEEPALIVE,
+            dns_cache_ttl=DEFAULT_BOT_API_DNS_CACHE_TTL,
+            timeout=DEFAULT_BOT_API_TIMEOUT,
+            method_timeouts={},
+        )
+        self.images = images or Images(
+            max_size=DEFAULT_IMAGE_MAX_SIZE,
+            image_format=DEFAULT_IMAGE_FORMAT,
+            quality=DEFAULT_IMAGE_QUALITY,
+            cache_dir=DEFAULT_IMAGE_CACHE_DIR,
+            workers=DEFAULT_IMAGE_WORKERS,
+        )
 
 
 def load_config(path: str | Path | None = None) -> Config:
@@ -25,6 +190,38 @@ def load_config(path: str | Path | None = None) -> Config:
     return Config(
         tg_bot=TgBot(token=env("BOT_TOKEN")),
         admin_id=env("ADMIN_ID", default=""),
+        webhook=Webhook(
+            mode=env("BOT_MODE", default="polling").strip().lower(),
+            url=env("WEBHOOK_URL", default=""),
+            path=env("WEBHOOK_PATH", default="/webhook"),
+            secret=env("WEBHOOK_SECRET", default=""),
+            host=env("WEBHOOK_HOST", default="0.0.0.0"),
+            port=env.int("WEBHOOK_PORT", default=8080),
+            max_connections=env.int("WEBHOOK_MAX_CONNECTIONS", default=40),
+        ),
+        workers=env.int("BOT_WORKERS", default=1),
+        concurrency=env.int("UPDATE_CONCURRENCY", default=64),
+        metrics=Metrics(
+            host=env("METRICS_HOST", default="127.0.0.1"),
+            port=env.int("METRICS_PORT", default=0),
+        ),
+        bot_api=BotApi(
+            url=env("BOT_API_URL", default=""),
+            local=env.bool("BOT_API_LOCAL", default=False),
+            pool_size=env.int("BOT_API_POOL_SIZE", default=DEFAULT_BOT_API_POOL_SIZE),
+            bulk_pool_size=env.int("BOT_API_BULK_POOL_SIZE", default=DEFAULT_BOT_API_BULK_POOL_SIZE),
+            keepalive=env.float("BOT_API_KEEPALIVE", default=DEFAULT_BOT_API_KEEPALIVE),
+            dns_cache_ttl=env.int("BOT_API_DNS_CACHE_TTL", default=DEFAULT_BOT_API_DNS_CACHE_TTL),
+            timeout=env.float("BOT_API_TIMEOUT", default=DEFAULT_BOT_API_TIMEOUT),
+            method_timeouts=env.dict("BOT_API_METHOD_TIMEOUTS", subcast_values=float, default={}),
+        ),
+        images=Images(
+            max_size=env.int("IMAGE_MAX_SIZE", default=DEFAULT_IMAGE_MAX_SIZE),
+            image_format=env("IMAGE_FORMAT", default=DEFAULT_IMAGE_FORMAT).strip().lower(),
+            quality=env.int("IMAGE_QUALITY", default=DEFAULT_IMAGE_QUALITY),
+            cache_dir=env("IMAGE_CACHE_DIR", default=DEFAULT_IMAGE_CACHE_DIR),
+            workers=env.int("IMAGE_WORKERS", default=DEFAULT_IMAGE_WORKERS),
+        ),
     )
 
 
@@ -36,4 +233,19 @@ def is_admin(telegram_id: int) -> bool:
     return str(telegram_id) in config_aiogram.admin_ids
 
 
-aiogram_bot = Bot(token=config_aiogram.tg_bot.token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+aiogram_bot = Bot(
+    token=config_aiogram.tg_bot.token,
+    session=config_aiogram.bot_api.create_session(),
+    default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+)
+# Рассылки идут через отдельный пул соединений, чтобы не занимать соединения обработчиков
+# (BOT_API_BULK_POOL_SIZE=0 — общий пул)
+bulk_bot = (
+    Bot(
+        token=config_aiogram.tg_bot.token,
+        session=config_aiogram.bot_api.create_session(bulk=True),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    if config_aiogram.bot_api.bulk_pool_size
+    else aiogram_bot
+)
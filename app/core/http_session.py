@@ -0,0 +1,41 @@
+"""HTTP-сессия Bot API с настраиваемым пулом соединений, keep-alive, DNS-кэшем и таймаутами по методам."""
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """AiohttpSession with connector options and per-method default timeouts (seconds)."""
+
+    def __init__(
+        self,
+        limit: int,
+        keepalive_timeout: float,
+        dns_cache_ttl: int,
+        timeout: float,
+        method_timeouts: dict[str, float],
+        api: TelegramAPIServer = PRODUCTION,
+        **kwargs: Any,
+    ):
+        super().__init__(limit=limit, api=api, timeout=timeout, **kwargs)
+        # параметры TCPConnector; сессия aiohttp создаётся лениво при первом запросе
+        self._connector_init.update(
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl or None,
+            use_dns_cache=dns_cache_ttl > 0,
+        )
+        self.method_timeouts = method_timeouts
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        if timeout is None:
+            timeout = self.method_timeouts.get(method.__api_method__)
+        return await super().make_request(bot, method, timeout=timeout)
@@ -1,6 +1,14 @@
-"""Настройка loguru: вывод в консоль и в файлы в app/logs."""
+"""
+Настройка loguru: вывод в консоль и в файлы в app/logs. Запись в синки идёт через очередь в отдельном
+потоке (enqueue=True) и не задерживает обработчики. Частые события (нажатия меню, /start, ошибки
+доставки рассылки) логируются с ключом sample и ограничиваются по частоте.
+"""
+import os
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Any
 
 from loguru import logger
 
@@ -11,23 +19,87 @@ APP_LOGS_DIR = Path(__file__).resolve().parent.parent / "logs"
 LOG_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> — <level>{message}</level>"
 FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} — {message}"
 
+DEFAULT_SAMPLE_RATE = 10
+
+
+class LogSampler:
+    """
+    Rate limit for records bound with sample=<key>: at most rate records per second per key.
+    The next record let through reports how many were dropped. rate <= 0 disables the limit.
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._lock = threading.Lock()
+        # key -> [начало текущей секунды, пропущено записей в ней, отброшено с прошлой записи]
+        self._windows: dict[str, list] = {}
+        # последняя запись потока и решение по ней: запись одна на все синки, решение принимается
+        # один раз и не попадает в extra (иначе оно оказалось бы в JSON-логе)
+        self._local = threading.local()
+
+    def __call__(self, record: dict[str, Any]) -> bool:
+        key = record["extra"].get("sample")
+        if key is None or self.rate <= 0:
+            return True
+        last = getattr(self._local, "last", None)
+        if last is not None and last[0] is record:
+            return last[1]
+        decision = self._allow(key, record)
+        self._local.last = (record, decision)
+        return decision
+
+    def _allow(self, key: str, record: dict[str, Any]) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                window = self._windows[key] = [now, 0, window[2] if window else 0]
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+            dropped, window[2] = window[2], 0
+        if dropped:
+            record["extra"]["dropped"] = dropped
+            record["message"] += f" (+{dropped} похожих пропущено)"
+        return True
+
 
 def setup_logging() -> None:
-    """Настроить loguru: убрать вывод по умолчанию, добавить консоль и файл в app/logs."""
+    """
+    Настроить loguru: убрать вывод по умолчанию, добавить консоль и файл в app/logs.
+    LOG_JSON=1 — дополнительно JSON-lines (bot_<дата>.jsonl), LOG_SAMPLE_RATE — сколько записей
+    одного частого события в секунду писать (0 — все).
+    """
     logger.remove()
     APP_LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    log_file = APP_LOGS_DIR / "bot_{time:YYYY-MM-DD}.log"
+    sampler = LogSampler(int(os.getenv("LOG_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)))
     logger.add(
-        log_file,
+        APP_LOGS_DIR / "bot_{time:YYYY-MM-DD}.log",
         format=FILE_FORMAT,
         level="DEBUG",
+        filter=sampler,
         rotation="1 day",
         retention="30 days",
         encoding="utf-8",
+        enqueue=True,
     )
+    if os.getenv("LOG_JSON", "").strip().lower() in ("1", "true", "yes"):
+        logger.add(
+            APP_LOGS_DIR / "bot_{time:YYYY-MM-DD}.jsonl",
+            level="DEBUG",
+            filter=sampler,
+            serialize=True,
+            rotation="1 day",
+            retention="30 days",
+            encoding="utf-8",
+            enqueue=True,
+        )
     logger.add(
         sys.stderr,
         format=LOG_FORMAT,
         level="INFO",
+        filter=sampler,
         colorize=True,
+        enqueue=True,
     )
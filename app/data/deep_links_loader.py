@@ -1,49 +1,69 @@
 from pathlib import Path
 from typing import Any
 
-import yaml
 from loguru import logger
 
+from app.data.yaml_cache import load_yaml_cached
+
 _deep_links_data: list[dict[str, Any]] | None = None
+_valid_slugs: frozenset[str] = frozenset()
 
 DEFAULT_DEEP_LINKS_PATH = Path(__file__).resolve().parent / "deep_links.yaml"
 
 
-def load_deep_links(file_path: str | Path | None = None) -> list[dict[str, Any]]:
-    """Load deep links config from YAML. Cached in memory."""
-    global _deep_links_data
+def resolve_deep_links_path(file_path: str | Path | None = None) -> Path:
+    """Return absolute path of the deep links file (relative paths are taken from app/data)."""
     path = Path(file_path) if file_path else DEFAULT_DEEP_LINKS_PATH
     if not path.is_absolute():
         path = Path(__file__).resolve().parent / path
+    return path
+
+
+def read_deep_links(path: Path) -> list[dict[str, Any]]:
+    """Parse deep links file into [{slug, name}] without touching the cache. Missing file = empty list."""
     if not path.exists():
         logger.warning("Файл deep links не найден: {}, используется пустой список", path)
-        _deep_links_data = []
-        return _deep_links_data
-    with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+        return []
+    data = load_yaml_cached(path)
+    if data is not None and not isinstance(data, dict):
+        raise ValueError("deep_links.yaml must be a mapping with 'links' key")
     raw = (data or {}).get("links")
     if not isinstance(raw, list):
-        _deep_links_data = []
-        return _deep_links_data
-    _deep_links_data = []
+        return []
+    links: list[dict[str, Any]] = []
     for item in raw:
         if isinstance(item, dict) and item.get("slug"):
-            _deep_links_data.append({
+            links.append({
                 "slug": str(item["slug"]).strip(),
                 "name": str(item.get("name") or item["slug"]).strip(),
             })
         elif isinstance(item, str) and item.strip():
             s = item.strip()
-            _deep_links_data.append({"slug": s, "name": s})
-    logger.info("Deep links загружены из {}: {} ссылок", path, len(_deep_links_data))
-    return _deep_links_data
+            links.append({"slug": s, "name": s})
+    return links
+
+
+def set_deep_links(links: list[dict[str, Any]]) -> None:
+    """Swap in a new deep links list and its slug set."""
+    global _deep_links_data, _valid_slugs
+    _valid_slugs = frozenset(item["slug"] for item in links)
+    _deep_links_data = links
+
+
+def load_deep_links(file_path: str | Path | None = None) -> list[dict[str, Any]]:
+    """Load deep links config from YAML. Cached in memory."""
+    path = resolve_deep_links_path(file_path)
+    links = read_deep_links(path)
+    set_deep_links(links)
+    logger.info("Deep links загружены из {}: {} ссылок", path, len(links))
+    return links
 
 
-def get_valid_deep_link_slugs() -> list[str]:
-    """Return list of valid slug strings (for validation). Load from file if not cached."""
+def get_valid_deep_link_slugs() -> frozenset[str]:
+    """Return the set of valid slugs (for validation), built when links are loaded. Load from file if not cached."""
     if _deep_links_data is None:
         load_deep_links()
-    return [item["slug"] for item in (_deep_links_data or [])]
+    return _valid_slugs
 
 
 def get_deep_links_with_names() -> list[dict[str, str]]:
@@ -1,82 +1,111 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
-import yaml
+from aiogram.types import InlineKeyboardMarkup
 from loguru import logger
 
-_content: dict[str, Any] | None = None
+from app.data.yaml_cache import load_yaml_cached
 
 DEFAULT_SECTIONS_PATH = Path(__file__).resolve().parent / "sections.yaml"
 
+DEFAULT_WELCOME_TEXT = "Добро пожаловать! Выберите раздел в меню ниже."
+DEFAULT_INFO_TEXT = "О нас. Здесь можно разместить информацию о проекте или организации."
 
-def load_sections(file_path: str | Path | None = None) -> dict[str, Any]:
-    """Load sections and welcome data from YAML. Cached in memory."""
-    global _content
+
+@dataclass(frozen=True, slots=True)
+class SectionNode:
+    """Precomputed menu screen: text, resolved images, children and ready keyboards."""
+
+    path: str
+    title: str
+    text: str
+    images: tuple[str, ...]
+    children: tuple[str, ...]
+    parent: str | None
+    keyboard: InlineKeyboardMarkup
+    admin_keyboard: InlineKeyboardMarkup
+
+
+@dataclass(frozen=True, slots=True)
+class ContentSnapshot:
+    """Immutable compiled content. Path '' is the main menu (welcome screen)."""
+
+    content: Mapping[str, Any]
+    nodes: Mapping[str, SectionNode]
+    info_text: str
+    info_images: tuple[str, ...]
+
+
+_snapshot: ContentSnapshot | None = None
+
+
+def resolve_sections_path(file_path: str | Path | None = None) -> Path:
+    """Return absolute path of the sections file (relative paths are taken from app/data)."""
     path = Path(file_path) if file_path else DEFAULT_SECTIONS_PATH
     if not path.is_absolute():
         path = Path(__file__).resolve().parent / path
+    return path
+
+
+def read_sections(path: Path) -> ContentSnapshot:
+    """Parse, validate and compile the sections file without touching the current snapshot."""
     if not path.exists():
         raise FileNotFoundError(f"Sections file not found: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        _content = yaml.safe_load(f)
-    if not _content or "sections" not in _content:
+    content = load_yaml_cached(path)
+    if not content or "sections" not in content:
         raise ValueError("sections.yaml must contain 'sections' key")
-    logger.info("Разделы загружены из {}", path)
-    return _content
+    if not isinstance(content["sections"], list):
+        raise ValueError("'sections' in sections.yaml must be a list")
+    return compile_content(content)
+
 
+def set_snapshot(snapshot: ContentSnapshot) -> None:
+    """Swap in a new compiled snapshot (single assignment — readers never see a partial state)."""
+    global _snapshot
+    _snapshot = snapshot
 
-def get_content() -> dict[str, Any]:
-    """Return cached content; load from file if not yet loaded."""
-    global _content
-    if _content is None:
+
+def load_sections(file_path: str | Path | None = None) -> Mapping[str, Any]:
+    """Load sections and welcome data from YAML and compile them into an indexed snapshot."""
+    path = resolve_sections_path(file_path)
+    snapshot = read_sections(path)
+    set_snapshot(snapshot)
+    logger.info("Разделы загружены из {}: {} экранов", path, len(snapshot.nodes))
+    return snapshot.content
+
+
+def get_snapshot() -> ContentSnapshot:
+    """Return compiled content snapshot; load from file if not yet loaded."""
+    if _snapshot is None:
         load_sections()
-    return _content
-
-
-def _find_node_by_path(nodes: list[dict], path: str) -> dict[str, Any] | None:
-    """Find a node in nested list by path like '1' or '1_2'."""
-    parts = path.split("_") if path else []
-    if not parts:
-        return None
-    current = nodes
-    for i, part in enumerate(parts):
-        key = "_".join(parts[: i + 1])
-        found = None
-        for node in current:
-            if node.get("id") == key:
-                found = node
-                break
-        if found is None:
-            return None
-        if i == len(parts) - 1:
-            return found
-        current = found.get("children") or []
-    return None
-
-
-def get_children_for_path(path: str | None) -> list[dict[str, Any]]:
+    return _snapshot
+
+
+def get_content() -> Mapping[str, Any]:
+    """Return raw parsed content; load from file if not yet loaded."""
+    return get_snapshot().content
+
+
+def get_section(path: str | None) -> SectionNode | None:
+    """Return compiled node for the path. path '' or None = main menu. None if path is unknown."""
+    return get_snapshot().nodes.get(path or "")
+
+
+def get_children_for_path(path: str | None) -> list[SectionNode]:
     """Return list of child nodes for the given path. path '' or None = top-level sections."""
-    content = get_content()
-    sections = content.get("sections") or []
-    if not path or path == "":
-        return sections
-    node = _find_node_by_path(sections, path)
+    snapshot = get_snapshot()
+    node = snapshot.nodes.get(path or "")
     if node is None:
         return []
-    return node.get("children") or []
+    return [snapshot.nodes[child] for child in node.children]
 
 
 def get_text_for_path(path: str | None) -> str:
     """Return message text for the given path. path '' or None = welcome text."""
-    content = get_content()
-    if not path or path == "":
-        welcome = content.get("welcome") or {}
-        return welcome.get("text") or "Добро пожаловать! Выберите раздел в меню ниже."
-    sections = content.get("sections") or []
-    node = _find_node_by_path(sections, path)
-    if node is None:
-        return ""
-    return node.get("text") or ""
+    node = get_section(path)
+    return node.text if node is not None else ""
 
 
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -99,26 +128,18 @@ def _resolve_image(item: str) -> str:
     return str(path.resolve())
 
 
-def get_images_for_path(path: str | None) -> list[str]:
-    """Return up to 3 image sources (URL or file path) for the section. Empty list if none."""
-    content = get_content()
-    if not path or path == "":
-        welcome = content.get("welcome") or {}
-        out: list[str] = []
-        for key in ("image_url", "image_path"):
-            v = welcome.get(key)
-            if v and str(v).strip():
-                out.append(_resolve_image(str(v)))
-        return out[:3]
-    sections = content.get("sections") or []
-    node = _find_node_by_path(sections, path)
-    if node is None:
-        return []
-    raw = node.get("images") or []
+def _resolve_images(raw: Any) -> tuple[str, ...]:
+    """Resolve up to 3 image sources from a YAML images list."""
     if not isinstance(raw, list):
-        return []
+        return ()
     resolved = [_resolve_image(str(x)) for x in raw[:3] if x]
-    return [r for r in resolved if r]
+    return tuple(r for r in resolved if r)
+
+
+def get_images_for_path(path: str | None) -> list[str]:
+    """Return up to 3 image sources (URL or file path) for the section. Empty list if none."""
+    node = get_section(path)
+    return list(node.images) if node is not None else []
 
 
 def get_parent_path(path: str) -> str:
@@ -137,19 +158,79 @@ def get_welcome() -> dict[str, Any]:
     return content.get("welcome") or {}
 
 
+def get_welcome_image_path() -> str:
+    """Return welcome image_path resolved like section images (same key for file_id and variant caches)."""
+    return _resolve_image(str(get_welcome().get("image_path") or ""))
+
+
 def get_info_text() -> str:
     """Return text for /info (О нас) page. Editable via sections.yaml."""
-    content = get_content()
-    info_block = content.get("info") or {}
-    return info_block.get("text") or "О нас. Здесь можно разместить информацию о проекте или организации."
+    return get_snapshot().info_text
 
 
 def get_info_images() -> list[str]:
     """Return up to 3 image sources (URL or file path) for /info. Empty list if none."""
-    content = get_content()
+    return list(get_snapshot().info_images)
+
+
+def compile_content(content: dict[str, Any]) -> ContentSnapshot:
+    """
+    Index the section tree by path and prebuild everything a menu click needs.
+    Images are resolved and keyboards (admin and non-admin) are built once here.
+    """
+    # Imported here: main_kb depends on this module for lookups.
+    from app.keyboards.main_kb import build_menu_keyboard
+
+    welcome = content.get("welcome") or {}
+    welcome_images: list[str] = []
+    for key in ("image_url", "image_path"):
+        v = welcome.get(key)
+        if v and str(v).strip():
+            welcome_images.append(_resolve_image(str(v)))
+
+    # path -> (title, text, images, children, parent)
+    entries: dict[str, tuple[str, str, tuple[str, ...], list[str], str | None]] = {
+        "": ("", welcome.get("text") or DEFAULT_WELCOME_TEXT, tuple(welcome_images[:3]), [], None),
+    }
+    stack: list[tuple[str, list[Any]]] = [("", content.get("sections") or [])]
+    while stack:
+        parent, raw_children = stack.pop()
+        for raw in raw_children:
+            if not isinstance(raw, dict) or not raw.get("id"):
+                continue
+            node_id = str(raw["id"])
+            if node_id in entries:
+                logger.warning("Повторяющийся id раздела в sections.yaml: {}", node_id)
+                continue
+            entries[node_id] = (
+                str(raw.get("title", node_id)),
+                raw.get("text") or "",
+                _resolve_images(raw.get("images") or []),
+                [],
+                parent,
+            )
+            entries[parent][3].append(node_id)
+            stack.append((node_id, raw.get("children") or []))
+
+    nodes: dict[str, SectionNode] = {}
+    for path, (title, text, images, children, parent) in entries.items():
+        buttons = [(child, entries[child][0]) for child in children]
+        back = parent if parent is not None else ""
+        nodes[path] = SectionNode(
+            path=path,
+            title=title,
+            text=text,
+            images=images,
+            children=tuple(children),
+            parent=parent,
+            keyboard=build_menu_keyboard(path, buttons, back, is_admin=False),
+            admin_keyboard=build_menu_keyboard(path, buttons, back, is_admin=True),
+        )
+
     info_block = content.get("info") or {}
-    raw = info_block.get("images") or []
-    if not isinstance(raw, list):
-        return []
-    resolved = [_resolve_image(str(x)) for x in raw[:3] if x]
-    return [r for r in resolved if r]
+    return ContentSnapshot(
+        content=MappingProxyType(content),
+        nodes=MappingProxyType(nodes),
+        info_text=info_block.get("text") or DEFAULT_INFO_TEXT,
+        info_images=_resolve_images(info_block.get("images") or []),
+    )
@@ -0,0 +1,30 @@
+"""
+Предварительная сборка кэша контента (например, при сборке Docker-образа):
+
+    python -m app.data.precompile [sections.yaml] [deep_links.yaml]
+"""
+import sys
+
+from app.data.deep_links_loader import read_deep_links, resolve_deep_links_path
+from app.data.loader import read_sections, resolve_sections_path
+from app.data.yaml_cache import cache_path_for
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    sections_path = resolve_sections_path(args[0] if len(args) > 0 else None)
+    deep_links_path = resolve_deep_links_path(args[1] if len(args) > 1 else None)
+    try:
+        snapshot = read_sections(sections_path)
+        links = read_deep_links(deep_links_path)
+    except Exception as e:
+        print(f"Ошибка в контенте: {e}", file=sys.stderr)
+        return 1
+    print(f"{sections_path}: {len(snapshot.nodes)} экранов -> {cache_path_for(sections_path)}")
+    if deep_links_path.exists():
+        print(f"{deep_links_path}: {len(links)} ссылок -> {cache_path_for(deep_links_path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
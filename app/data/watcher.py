@@ -0,0 +1,126 @@
+"""Горячая перезагрузка sections.yaml и deep_links.yaml: inotify (watchfiles), иначе опрос mtime."""
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from app.data.deep_links_loader import read_deep_links, resolve_deep_links_path, set_deep_links
+from app.data.loader import ContentSnapshot, read_sections, resolve_sections_path, set_snapshot
+from app.utils.image_variants import image_variants, snapshot_images
+
+try:
+    from watchfiles import awatch
+except ImportError:  # optional dependency
+    awatch = None
+
+POLL_INTERVAL = 2.0
+
+
+class _WatchedFile:
+    """Файл контента: как прочитать (в потоке) и как подменить загруженное состояние."""
+
+    def __init__(self, path: Path, read: Callable[[Path], Any], apply: Callable[[Any], None]):
+        self.path = path
+        self.read = read
+        self.apply = apply
+        self.mtime_ns = self._stat()
+
+    def _stat(self) -> int | None:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def changed(self) -> bool:
+        mtime_ns = self._stat()
+        if mtime_ns == self.mtime_ns:
+            return False
+        self.mtime_ns = mtime_ns
+        return True
+
+
+def _apply_sections(snapshot: ContentSnapshot) -> None:
+    set_snapshot(snapshot)
+    # новые и изменённые картинки готовятся в фоне; до готовности отправляются оригиналы
+    image_variants.schedule(snapshot_images(snapshot))
+
+
+class ContentWatcher:
+    """
+    Следит за файлами контента. Изменённый файл разбирается и проверяется вне event loop,
+    затем новое состояние подменяется одним присваиванием. Ошибка — остаётся прежнее состояние.
+    """
+
+    def __init__(self) -> None:
+        self._files: list[_WatchedFile] = []
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def start(self, sections_path: str | Path | None = None, deep_links_path: str | Path | None = None) -> None:
+        """Начать слежение (после первичной загрузки контента)."""
+        self._files = [
+            _WatchedFile(resolve_sections_path(sections_path), read_sections, _apply_sections),
+            _WatchedFile(resolve_deep_links_path(deep_links_path), read_deep_links, set_deep_links),
+        ]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reload_file(self, watched: _WatchedFile) -> bool:
+        try:
+            loaded = await asyncio.to_thread(watched.read, watched.path)
+        except Exception as e:
+            logger.error("Файл {} не перезагружен, используется прежняя версия: {}", watched.path, e)
+            return False
+        watched.apply(loaded)
+        logger.info("Контент перезагружен из {}", watched.path)
+        return True
+
+    async def reload(self, force: bool = False) -> dict[str, bool]:
+        """Перечитать изменённые файлы (force — все). Returns {file name: success} for reloaded files."""
+        results: dict[str, bool] = {}
+        async with self._lock:
+            for watched in self._files:
+                if watched.changed() or force:
+                    results[watched.path.name] = await self._reload_file(watched)
+        return results
+
+    async def _run(self) -> None:
+        if awatch is not None:
+            try:
+                await self._run_inotify()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Слежение через watchfiles недоступно ({}), переключаюсь на опрос mtime", e)
+        await self._run_polling()
+
+    async def _run_inotify(self) -> None:
+        # Следим за каталогами: редакторы часто сохраняют файл через замену (rename)
+        directories = {str(watched.path.parent) for watched in self._files}
+        logger.info("Слежение за контентом (inotify): {}", ", ".join(sorted(directories)))
+        async for _ in awatch(*directories):
+            await self.reload()
+
+    async def _run_polling(self) -> None:
+        logger.info("Слежение за контентом (опрос mtime раз в {} с)", POLL_INTERVAL)
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error("Ошибка перезагрузки контента: {}", e)
+
+
+content_watcher = ContentWatcher()
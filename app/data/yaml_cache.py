@@ -0,0 +1,70 @@
+"""
+Чтение YAML с бинарным кэшем рядом с файлом: .<имя>.cache хранит разобранные данные,
+ключ — mtime/размер и sha256 исходника. Тёплый старт не разбирает YAML.
+"""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any
+
+import yaml
+from loguru import logger
+
+# C-ускоренный загрузчик (libyaml), если PyYAML собран с ним
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_VERSION = 1
+
+
+def cache_path_for(path: Path) -> Path:
+    return path.with_name(f".{path.name}.cache")
+
+
+def _read_cache(cache_path: Path) -> dict[str, Any] | None:
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug("Кэш {} не прочитан: {}", cache_path, e)
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(cache_path: Path, entry: dict[str, Any]) -> None:
+    # своё имя временного файла в каждом процессе: обработчики пишут кэш одновременно при старте
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug("Кэш {} не записан: {}", cache_path, e)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def load_yaml_cached(path: Path) -> Any:
+    """Return parsed YAML of path, from the binary cache when the source is unchanged."""
+    st = path.stat()
+    cache_path = cache_path_for(path)
+    cached = _read_cache(cache_path)
+    if cached is not None and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return cached["data"]
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if cached is not None and cached["sha256"] == digest:
+        data = cached["data"]
+    else:
+        data = yaml.load(raw.decode("utf-8"), Loader=SafeLoader)
+    _write_cache(
+        cache_path,
+        {"version": CACHE_VERSION, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest, "data": data},
+    )
+    return data
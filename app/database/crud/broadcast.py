@@ -0,0 +1,147 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.crud.user import set_users_status
+from app.database.models import (
+    BROADCAST_CANCELLED,
+    BROADCAST_DONE,
+    BROADCAST_NEW,
+    BROADCAST_PAUSED,
+    BROADCAST_RUNNING,
+    DELIVERY_FAILED,
+    DELIVERY_PENDING,
+    DELIVERY_SENT,
+    USER_ACTIVE,
+    BroadcastDelivery,
+    BroadcastJob,
+    User,
+)
+
+
+async def create_broadcast_job(session: AsyncSession, text: str, admin_chat_id: int) -> BroadcastJob:
+    """
+    Create a job with a pending delivery row for every active user. The job is created as new and is not
+    picked up by the worker until activate_broadcast_job.
+    """
+    job = BroadcastJob(text=text, admin_chat_id=admin_chat_id, status=BROADCAST_NEW)
+    session.add(job)
+    await session.flush()
+    result = await session.execute(
+        insert(BroadcastDelivery).from_select(
+            ["job_id", "telegram_id", "status"],
+            select(literal(job.id), User.telegram_id, literal(DELIVERY_PENDING)).where(
+                User.status == USER_ACTIVE
+            ),
+        )
+    )
+    job.total = result.rowcount or 0
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def get_broadcast_job(session: AsyncSession, job_id: int) -> BroadcastJob | None:
+    """Return job by id or None."""
+    return await session.get(BroadcastJob, job_id)
+
+
+async def get_broadcast_jobs_by_status(session: AsyncSession, *statuses: str) -> list[BroadcastJob]:
+    """Return jobs with any of the given statuses, oldest first."""
+    result = await session.execute(
+        select(BroadcastJob).where(BroadcastJob.status.in_(statuses)).order_by(BroadcastJob.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_active_broadcast_jobs(session: AsyncSession) -> list[BroadcastJob]:
+    """Return running and paused jobs (shown in the admin panel)."""
+    return await get_broadcast_jobs_by_status(session, BROADCAST_RUNNING, BROADCAST_PAUSED)
+
+
+async def get_pending_recipients(session: AsyncSession, job_id: int, limit: int) -> list[int]:
+    """Return up to limit telegram_ids that have not received the job yet."""
+    result = await session.execute(
+        select(BroadcastDelivery.telegram_id)
+        .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.status == DELIVERY_PENDING)
+        .order_by(BroadcastDelivery.telegram_id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def save_delivery_results(
+    session: AsyncSession,
+    job_id: int,
+    sent_ids: list[int],
+    failed_ids: list[int],
+    inactive: dict[int, str] | None = None,
+) -> None:
+    """
+    Mark recipients as sent/failed and add them to the job counters in one transaction;
+    inactive (telegram_id -> blocked/deactivated) updates the users' status.
+    """
+    for ids, status in ((sent_ids, DELIVERY_SENT), (failed_ids, DELIVERY_FAILED)):
+        if ids:
+            await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.telegram_id.in_(ids))
+                .values(status=status)
+            )
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id)
+        .values(
+            sent=BroadcastJob.sent + len(sent_ids),
+            failed=BroadcastJob.failed + len(failed_ids),
+        )
+    )
+    if inactive:
+        await set_users_status(session, inactive)
+    await session.commit()
+
+
+# из каких статусов разрешён переход: завершённые задачи (done/cancelled) не меняются
+_STATUS_FROM = {
+    BROADCAST_RUNNING: (BROADCAST_PAUSED,),
+    BROADCAST_PAUSED: (BROADCAST_RUNNING,),
+    BROADCAST_CANCELLED: (BROADCAST_RUNNING, BROADCAST_PAUSED),
+    BROADCAST_DONE: (BROADCAST_RUNNING,),
+}
+
+
+async def delete_finished_deliveries(session: AsyncSession) -> int:
+    """Delete delivery rows of done/cancelled jobs (their counters stay on the job). Returns the row count."""
+    finished = select(BroadcastJob.id).where(BroadcastJob.status.in_((BROADCAST_DONE, BROADCAST_CANCELLED)))
+    result = await session.execute(delete(BroadcastDelivery).where(BroadcastDelivery.job_id.in_(finished)))
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def set_broadcast_job_status(session: AsyncSession, job_id: int, status: str) -> BroadcastJob | None:
+    """
+    Change job status if the transition is allowed (running<->paused, running/paused -> cancelled,
+    running -> done); finished jobs get finished_at. Returns the job as stored (the caller compares
+    its status with the requested one) or None if there is no such job.
+    """
+    values: dict = {"status": status}
+    if status in (BROADCAST_DONE, BROADCAST_CANCELLED):
+        values["finished_at"] = datetime.utcnow()
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id, BroadcastJob.status.in_(_STATUS_FROM[status]))
+        .values(**values)
+    )
+    await session.commit()
+    return await session.get(BroadcastJob, job_id)
+
+
+async def activate_broadcast_job(session: AsyncSession, job_id: int, message_id: int | None) -> None:
+    """Remember the admin message that shows job progress and hand the new job to the worker (running)."""
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id, BroadcastJob.status == BROADCAST_NEW)
+        .values(status_message_id=message_id, status=BROADCAST_RUNNING)
+    )
+    await session.commit()
@@ -0,0 +1,66 @@
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import MediaFileId, MediaGroupMessages
+
+
+async def get_media_file_id(session: AsyncSession, path: str, file_hash: str) -> str | None:
+    """Return cached Telegram file_id for the file path and content hash, or None."""
+    result = await session.execute(
+        select(MediaFileId.file_id).where(
+            MediaFileId.path == path,
+            MediaFileId.file_hash == file_hash,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def save_media_file_id(session: AsyncSession, path: str, file_hash: str, file_id: str) -> None:
+    """Store file_id for the path and hash; rows for older versions of the file are removed."""
+    await session.execute(delete(MediaFileId).where(MediaFileId.path == path))
+    session.add(MediaFileId(path=path, file_hash=file_hash, file_id=file_id))
+    await session.commit()
+
+
+async def save_media_group(session: AsyncSession, chat_id: int, message_ids: list[int], created_at: int) -> None:
+    """Store media group message ids of the chat (replaces previous)."""
+    stmt = sqlite_insert(MediaGroupMessages).values(
+        chat_id=chat_id,
+        message_ids=",".join(map(str, message_ids)),
+        created_at=created_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaGroupMessages.chat_id],
+        set_={"message_ids": stmt.excluded.message_ids, "created_at": stmt.excluded.created_at},
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def pop_media_group(session: AsyncSession, chat_id: int, created_after: int) -> list[int]:
+    """Delete and return media group message ids of the chat; older than created_after are ignored."""
+    result = await session.execute(
+        delete(MediaGroupMessages)
+        .where(MediaGroupMessages.chat_id == chat_id)
+        .returning(MediaGroupMessages.message_ids, MediaGroupMessages.created_at)
+    )
+    row = result.first()
+    await session.commit()
+    if row is None or row[1] <= created_after:
+        return []
+    return [int(x) for x in row[0].split(",") if x]
+
+
+async def get_media_group_chat_ids(session: AsyncSession, created_after: int) -> list[int]:
+    """Return chat ids that have a stored media group newer than created_after."""
+    result = await session.execute(
+        select(MediaGroupMessages.chat_id).where(MediaGroupMessages.created_at > created_after)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_media_groups_before(session: AsyncSession, created_before: int) -> None:
+    """Remove stored media groups created at or before created_before."""
+    await session.execute(delete(MediaGroupMessages).where(MediaGroupMessages.created_at <= created_before))
+    await session.commit()
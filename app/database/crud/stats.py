@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import DeepLinkDaily, User, UserStat
+
+
+async def get_user_stats(session: AsyncSession) -> list[tuple[str | None, int]]:
+    """Return (deep_link, count) from the counters table. None = без ссылки."""
+    result = await session.execute(select(UserStat.deep_link, UserStat.count))
+    return [(row[0] or None, row[1]) for row in result.all()]
+
+
+async def increment_user_stats(session: AsyncSession, increments: dict[str | None, int]) -> None:
+    """Add new-user counts per deep_link to the counters table; does not commit."""
+    if not increments:
+        return
+    stmt = sqlite_insert(UserStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStat.deep_link],
+        set_={"count": UserStat.count + stmt.excluded.count},
+    )
+    await session.execute(
+        stmt,
+        [{"deep_link": deep_link or "", "count": count} for deep_link, count in increments.items()],
+    )
+
+
+async def rebuild_user_stats(session: AsyncSession) -> None:
+    """Recount counters from the users table in one transaction."""
+    await session.execute(delete(UserStat))
+    await session.execute(
+        insert(UserStat).from_select(
+            ["deep_link", "count"],
+            select(func.coalesce(User.deep_link, ""), func.count(User.id)).group_by(User.deep_link),
+        )
+    )
+    await session.commit()
+
+
+async def increment_deep_link_daily(session: AsyncSession, increments: dict[tuple[date, str | None], int]) -> None:
+    """Add new-user counts per (day, deep_link) to the daily rollup; does not commit."""
+    if not increments:
+        return
+    stmt = sqlite_insert(DeepLinkDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeepLinkDaily.day, DeepLinkDaily.deep_link],
+        set_={"new_users": DeepLinkDaily.new_users + stmt.excluded.new_users},
+    )
+    await session.execute(
+        stmt,
+        [
+            {"day": day, "deep_link": deep_link or "", "new_users": count}
+            for (day, deep_link), count in increments.items()
+        ],
+    )
+
+
+async def get_deep_link_periods(session: AsyncSession, today: date) -> list[tuple[str | None, int, int, int]]:
+    """Return (deep_link, today, last 7 days, last 30 days) from the daily rollup. None = без ссылки."""
+    week_start = today - timedelta(days=6)
+    month_start = today - timedelta(days=29)
+    result = await session.execute(
+        select(
+            DeepLinkDaily.deep_link,
+            func.sum(case((DeepLinkDaily.day >= today, DeepLinkDaily.new_users), else_=0)),
+            func.sum(case((DeepLinkDaily.day >= week_start, DeepLinkDaily.new_users), else_=0)),
+            func.sum(DeepLinkDaily.new_users),
+        )
+        .where(DeepLinkDaily.day >= month_start)
+        .group_by(DeepLinkDaily.deep_link)
+    )
+    return [(row[0] or None, row[1], row[2], row[3]) for row in result.all()]
+
+
+async def rebuild_deep_link_daily(session: AsyncSession) -> None:
+    """Recount the daily rollup from the users table in one transaction (backfill)."""
+    await session.execute(delete(DeepLinkDaily))
+    day = func.date(User.created_at)
+    deep_link = func.coalesce(User.deep_link, "")
+    await session.execute(
+        insert(DeepLinkDaily).from_select(
+            ["day", "deep_link", "new_users"],
+            select(day, deep_link, func.count(User.id))
+            .where(User.created_at.is_not(None))
+            .group_by(day, deep_link),
+        )
+    )
+    await session.commit()
@@ -1,7 +1,16 @@
-from sqlalchemy import func, select
+from collections.abc import AsyncIterator, Iterable
+
+from datetime import datetime
+
+from sqlalchemy import Row, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import User
+from app.database.crud.stats import increment_deep_link_daily, increment_user_stats
+from app.database.models import USER_ACTIVE, User
+
+# Ограничение числа параметров в одном запросе SQLite
+IN_CHUNK_SIZE = 500
 
 
 async def get_or_create_user(
@@ -10,25 +19,100 @@ async def get_or_create_user(
     username: str | None = None,
     deep_link: str | None = None,
 ) -> User:
-    """Get user by telegram_id or create with username, created_at and optional deep_link."""
+    """Get user by telegram_id (reactivating a blocked one) or create with username, created_at and optional deep_link."""
     result = await session.execute(select(User).where(User.telegram_id == telegram_id))
     user = result.scalar_one_or_none()
     if user is not None:
+        changed = False
         if username is not None and user.username != username:
             user.username = username
+            changed = True
+        if user.status != USER_ACTIVE:
+            user.status = USER_ACTIVE
+            changed = True
+        if changed:
             await session.commit()
             await session.refresh(user)
         return user
     user = User(telegram_id=telegram_id, username=username, deep_link=deep_link)
     session.add(user)
+    await session.flush()
+    # пользователь и счётчики — в одной транзакции
+    await increment_user_stats(session, {deep_link: 1})
+    await increment_deep_link_daily(session, {(user.created_at.date(), deep_link): 1})
     await session.commit()
     await session.refresh(user)
     return user
 
 
+async def upsert_users(session: AsyncSession, rows: list[dict]) -> None:
+    """
+    Insert users in one batch; for existing telegram_id only a non-empty username is updated.
+    rows: dicts with telegram_id, username, deep_link, created_at. Does not commit.
+    """
+    if not rows:
+        return
+    stmt = sqlite_insert(User)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={"username": func.coalesce(stmt.excluded.username, User.username)},
+    )
+    await session.execute(stmt, rows)
+
+
+async def insert_new_users(session: AsyncSession, rows: list[dict]) -> set[int]:
+    """
+    Insert users that are not in the DB yet; rows with an existing telegram_id are skipped.
+    Returns telegram_ids actually inserted. Does not commit.
+    """
+    if not rows:
+        return set()
+    stmt = sqlite_insert(User).on_conflict_do_nothing(index_elements=[User.telegram_id]).returning(User.telegram_id)
+    result = await session.execute(stmt, rows)
+    return set(result.scalars().all())
+
+
+async def reactivate_users(session: AsyncSession, telegram_ids: Iterable[int]) -> int:
+    """
+    Mark users that came back (/start) as active; only rows with another status are written.
+    Returns their count. Does not commit.
+    """
+    ids = list(telegram_ids)
+    count = 0
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        result = await session.execute(
+            update(User)
+            .where(User.telegram_id.in_(ids[start : start + IN_CHUNK_SIZE]), User.status != USER_ACTIVE)
+            .values(status=USER_ACTIVE)
+        )
+        count += result.rowcount or 0
+    return count
+
+
+async def set_users_status(session: AsyncSession, statuses: dict[int, str]) -> None:
+    """Set delivery status (blocked/deactivated) and last_error_at by telegram_id; does not commit."""
+    by_status: dict[str, list[int]] = {}
+    for telegram_id, status in statuses.items():
+        by_status.setdefault(status, []).append(telegram_id)
+    now = datetime.utcnow()
+    for status, ids in by_status.items():
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            await session.execute(
+                update(User)
+                .where(User.telegram_id.in_(ids[start : start + IN_CHUNK_SIZE]))
+                .values(status=status, last_error_at=now)
+            )
+
+
+async def get_known_users(session: AsyncSession) -> list[tuple[int, str | None]]:
+    """Return (telegram_id, username) of all users to warm the in-memory index."""
+    result = await session.execute(select(User.telegram_id, User.username))
+    return [(row[0], row[1]) for row in result.all()]
+
+
 async def get_all_telegram_ids(session: AsyncSession) -> list[int]:
-    """Return list of all user telegram_ids for broadcast."""
-    result = await session.execute(select(User.telegram_id))
+    """Return telegram_ids of active users (not blocked/deactivated) for broadcast."""
+    result = await session.execute(select(User.telegram_id).where(User.status == USER_ACTIVE))
     return list(result.scalars().all())
 
 
@@ -44,6 +128,17 @@ async def get_all_users(session: AsyncSession) -> list[User]:
     return list(result.scalars().unique().all())
 
 
+async def iter_users_rows(session: AsyncSession, batch_size: int = 1000) -> AsyncIterator[list[Row]]:
+    """Stream (id, telegram_id, username, created_at, deep_link) rows ordered by id in batches, without ORM objects."""
+    result = await session.stream(
+        select(User.id, User.telegram_id, User.username, User.created_at, User.deep_link)
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
 async def get_users_count_by_deep_link(session: AsyncSession) -> list[tuple[str | None, int]]:
     """Return list of (deep_link, count) for admin stats. None = без ссылки."""
     result = await session.execute(
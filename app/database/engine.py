@@ -1,20 +1,80 @@
 import os
+import time
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from app.database.base import Base
+from app.utils.metrics import DB_SECONDS
 
 # Default SQLite URL if not set in env
 DEFAULT_DATABASE_URL = "sqlite+aiosqlite:////app/data/bot.db"
 
+# SQLite connection profile (env overrides). WAL lets admin reads run alongside /start writes.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": "268435456",  # 256 MB
+    "cache_size": "-65536",  # KiB when negative: 64 MB
+    "busy_timeout": "5000",  # ms
+    "temp_store": "MEMORY",
+}
+
+
+def get_sqlite_pragmas() -> dict[str, str]:
+    """Return PRAGMA values: defaults overridden by SQLITE_<NAME> env vars (empty value disables a pragma)."""
+    pragmas: dict[str, str] = {}
+    for name, default in DEFAULT_SQLITE_PRAGMAS.items():
+        value = os.getenv(f"SQLITE_{name.upper()}", default).strip()
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def _apply_sqlite_pragmas(sync_engine, pragmas: dict[str, str]) -> None:
+    """Run PRAGMAs on every new DBAPI connection."""
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _time_queries(sync_engine) -> None:
+    """Observe query durations in bot_db_query_duration_seconds by statement kind (SELECT, INSERT, ...)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        start = conn.info["query_start"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_SECONDS.observe(time.perf_counter() - start, statement=kind)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context) -> None:
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
 
 def get_async_engine() -> "create_async_engine":
     """Create async engine for aiosqlite using DATABASE_URL from env or default."""
     database_url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
-    return create_async_engine(
+    engine = create_async_engine(
         database_url,
         echo=False,
     )
+    if engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(engine.sync_engine, get_sqlite_pragmas())
+    _time_queries(engine.sync_engine)
+    return engine
 
 
 async_engine = get_async_engine()
@@ -0,0 +1,135 @@
+"""FSM storage в SQLite: состояние переживает перезапуск и общее для нескольких процессов бота."""
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.engine import async_engine
+from app.database.models import FsmRecord
+
+# Время жизни записи после последнего изменения, секунды (0 — без ограничения)
+DEFAULT_FSM_TTL = 24 * 60 * 60
+# Кэш со сквозной записью: сколько ключей держать и сколько секунд доверять закэшированному значению
+# (FSM_CACHE_TTL). Обновления одного чата всегда обрабатывает один процесс (app.workers), так что
+# запись меняет только он сам; пустое состояние тоже кэшируется.
+CACHE_SIZE = 10_000
+DEFAULT_CACHE_TTL = 60 * 60
+PURGE_INTERVAL = 10 * 60
+
+
+class SqliteStorage(BaseStorage):
+    """aiogram FSM storage on top of the app's async SQLAlchemy engine (table fsm_storage)."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine = async_engine,
+        ttl: int | None = None,
+        key_builder: KeyBuilder | None = None,
+        cache_ttl: float | None = None,
+    ):
+        self.engine = engine
+        self.ttl = ttl if ttl is not None else int(os.getenv("FSM_TTL", DEFAULT_FSM_TTL))
+        self.cache_ttl = (
+            cache_ttl if cache_ttl is not None else float(os.getenv("FSM_CACHE_TTL", DEFAULT_CACHE_TTL))
+        )
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        # key -> (cached_at, expires_at записи (unix time) или None, state, data)
+        self._cache: OrderedDict[str, tuple[float, int | None, str | None, dict[str, Any]]] = OrderedDict()
+        self._last_purge = 0.0
+
+    def _expires_at(self) -> int | None:
+        return int(time.time()) + self.ttl if self.ttl > 0 else None
+
+    def _remember(self, key: str, state: str | None, data: dict[str, Any], expires_at: int | None) -> None:
+        self._cache[key] = (time.monotonic(), expires_at, state, data)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: str) -> tuple[str | None, dict[str, Any]]:
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            _, expires_at, state, data = cached
+            if expires_at is not None and expires_at <= time.time():
+                # запись истекла по FSM_TTL — как и в БД, состояния больше нет
+                return None, {}
+            return state, data
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(FsmRecord.state, FsmRecord.data, FsmRecord.expires_at).where(
+                    FsmRecord.key == key,
+                    or_(FsmRecord.expires_at.is_(None), FsmRecord.expires_at > int(time.time())),
+                )
+            )
+            row = result.first()
+        if row is None:
+            self._remember(key, None, {}, None)
+            return None, {}
+        state, data = row[0], json.loads(row[1]) if row[1] else {}
+        self._remember(key, state, data, row[2])
+        return state, data
+
+    async def _save(self, key: str, values: dict[str, Any]) -> int | None:
+        """
+        Upsert given columns of the record; the record is removed once it has no state and no data.
+        Returns the new expires_at.
+        """
+        values["expires_at"] = self._expires_at()
+        stmt = sqlite_insert(FsmRecord).values(key=key, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[FsmRecord.key], set_=values)
+        async with self.engine.begin() as conn:
+            # просроченная запись не должна «воскреснуть» вместе со старыми полями
+            await conn.execute(
+                delete(FsmRecord).where(FsmRecord.key == key, FsmRecord.expires_at <= int(time.time()))
+            )
+            await conn.execute(stmt)
+            await conn.execute(
+                delete(FsmRecord).where(
+                    FsmRecord.key == key,
+                    FsmRecord.state.is_(None),
+                    FsmRecord.data.is_(None),
+                )
+            )
+        await self._purge_expired()
+        return values["expires_at"]
+
+    async def _purge_expired(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(FsmRecord).where(FsmRecord.expires_at <= int(time.time())))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        value = state.state if isinstance(state, State) else state
+        _, data = await self._load(storage_key)
+        expires_at = await self._save(storage_key, {"state": value})
+        self._remember(storage_key, value, data, expires_at)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        value = dict(data)
+        state, _ = await self._load(storage_key)
+        expires_at = await self._save(storage_key, {"data": json.dumps(value, ensure_ascii=False) if value else None})
+        self._remember(storage_key, state, value, expires_at)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(self.key_builder.build(key))
+        return dict(data)
+
+    async def close(self) -> None:
+        self._cache.clear()
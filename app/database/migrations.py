@@ -0,0 +1,240 @@
+"""
+Версионированные миграции схемы. Номер последней применённой миграции хранится в schema_migrations;
+если схема актуальна, при старте выполняется только чтение этого номера. Каждая миграция вместе
+с записью о ней выполняется в одной транзакции и написана так, чтобы повторный запуск
+на уже изменённой схеме ничего не ломал. Данные пользователей не удаляются.
+"""
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str) -> Callable[[Callable[[Connection], None]], Callable[[Connection], None]]:
+    """Register a migration step; versions must be added in increasing order."""
+
+    def decorator(func: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if MIGRATIONS and MIGRATIONS[-1].version >= version:
+            raise ValueError(f"migration {version} is out of order")
+        MIGRATIONS.append(Migration(version, name, func))
+        return func
+
+    return decorator
+
+
+def _columns(conn: Connection, table: str) -> dict[str, str]:
+    """Column name -> declared type (lowercase) of an existing table; {} if the table is missing."""
+    rows = conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
+    # (cid, name, type, notnull, dflt_value, pk)
+    return {row[1]: (row[2] or "").strip().lower() for row in rows}
+
+
+def _execute(conn: Connection, statements: Iterable[str]) -> None:
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+def _rebuild_table(conn: Connection, name: str, create: str) -> None:
+    """Recreate a table with the given DDL and copy its rows over (SQLite cannot alter column types)."""
+    old_name = f"{name}_old"
+    for (index_name,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (name,),
+    ).fetchall():
+        conn.exec_driver_sql(f'DROP INDEX "{index_name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME TO "{old_name}"')
+    conn.exec_driver_sql(create)
+    new_columns = _columns(conn, name)
+    common = [column for column in _columns(conn, old_name) if column in new_columns]
+    column_list = ", ".join(f'"{column}"' for column in common)
+    conn.exec_driver_sql(f'INSERT INTO "{name}" ({column_list}) SELECT {column_list} FROM "{old_name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{old_name}"')
+
+
+# --- миграции ---
+# DDL каждой миграции зафиксирован на момент её версии и не зависит от текущих моделей:
+# изменения схемы — только новыми миграциями.
+
+USERS_V1 = """CREATE TABLE IF NOT EXISTS users (
+    id INTEGER NOT NULL,
+    telegram_id BIGINT NOT NULL,
+    username VARCHAR(255),
+    created_at DATETIME NOT NULL,
+    deep_link VARCHAR(255),
+    PRIMARY KEY (id),
+    UNIQUE (telegram_id)
+)"""
+
+
+@migration(1, "users table")
+def _users_table(conn: Connection) -> None:
+    columns = _columns(conn, "users")
+    if not columns:
+        conn.exec_driver_sql(USERS_V1)
+        return
+    if "created_at" not in columns:
+        # ALTER TABLE не принимает datetime('now') как значение по умолчанию — заполняем отдельно
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN created_at DATETIME")
+        conn.exec_driver_sql("UPDATE users SET created_at = datetime('now') WHERE created_at IS NULL")
+    if "deep_link" not in columns:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN deep_link VARCHAR(255)")
+    # старые базы: id без INTEGER PRIMARY KEY (SQLite не нумерует его сам) — пересобрать с сохранением строк
+    if columns.get("id") != "integer":
+        _rebuild_table(conn, "users", USERS_V1)
+
+
+@migration(2, "service tables")
+def _service_tables(conn: Connection) -> None:
+    _execute(
+        conn,
+        (
+            """CREATE TABLE IF NOT EXISTS media_file_ids (
+                id INTEGER NOT NULL,
+                path VARCHAR(1024) NOT NULL,
+                file_hash VARCHAR(64) NOT NULL,
+                file_id VARCHAR(255) NOT NULL,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id),
+                CONSTRAINT uq_media_file_ids_path_hash UNIQUE (path, file_hash)
+            )""",
+            """CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                admin_chat_id BIGINT NOT NULL,
+                status_message_id INTEGER,
+                total INTEGER NOT NULL,
+                sent INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                created_at DATETIME NOT NULL,
+                finished_at DATETIME,
+                PRIMARY KEY (id)
+            )""",
+            """CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+                job_id INTEGER NOT NULL,
+                telegram_id BIGINT NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                PRIMARY KEY (job_id, telegram_id),
+                FOREIGN KEY(job_id) REFERENCES broadcast_jobs (id) ON DELETE CASCADE
+            )""",
+            """CREATE TABLE IF NOT EXISTS user_stats (
+                deep_link VARCHAR(255) NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (deep_link)
+            )""",
+            """CREATE TABLE IF NOT EXISTS fsm_storage (
+                "key" VARCHAR(255) NOT NULL,
+                state VARCHAR(255),
+                data TEXT,
+                expires_at INTEGER,
+                PRIMARY KEY ("key")
+            )""",
+            """CREATE TABLE IF NOT EXISTS media_group_messages (
+                chat_id BIGINT NOT NULL,
+                message_ids VARCHAR(255) NOT NULL,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (chat_id)
+            )""",
+        ),
+    )
+
+
+@migration(3, "indexes")
+def _indexes(conn: Connection) -> None:
+    _execute(
+        conn,
+        (
+            "CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_users_deep_link ON users (deep_link)",
+            "CREATE INDEX IF NOT EXISTS ix_broadcast_jobs_status ON broadcast_jobs (status)",
+            "CREATE INDEX IF NOT EXISTS ix_broadcast_deliveries_job_status ON broadcast_deliveries (job_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_fsm_storage_expires_at ON fsm_storage (expires_at)",
+            "CREATE INDEX IF NOT EXISTS ix_media_group_messages_created_at ON media_group_messages (created_at)",
+        ),
+    )
+
+
+@migration(4, "deep link daily rollup")
+def _deep_link_daily(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        """CREATE TABLE IF NOT EXISTS deep_link_daily (
+            day DATE NOT NULL,
+            deep_link VARCHAR(255) NOT NULL,
+            new_users INTEGER NOT NULL,
+            PRIMARY KEY (day, deep_link)
+        )"""
+    )
+    # заполнить по уже зарегистрированным пользователям
+    conn.exec_driver_sql("DELETE FROM deep_link_daily")
+    conn.exec_driver_sql(
+        "INSERT INTO deep_link_daily (day, deep_link, new_users) "
+        "SELECT date(created_at), COALESCE(deep_link, ''), COUNT(*) FROM users "
+        "WHERE created_at IS NOT NULL GROUP BY date(created_at), COALESCE(deep_link, '')"
+    )
+
+
+@migration(5, "user delivery status")
+def _user_status(conn: Connection) -> None:
+    columns = _columns(conn, "users")
+    if "status" not in columns:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'active'")
+    if "last_error_at" not in columns:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN last_error_at DATETIME")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_users_status_telegram_id ON users (status, telegram_id)"
+    )
+
+
+# --- запуск ---
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT MAX(version) FROM schema_migrations"))
+        except OperationalError:
+            return 0
+        return result.scalar() or 0
+
+
+def _apply(conn: Connection, step: Migration) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+        "applied_at DATETIME NOT NULL DEFAULT (datetime('now')))"
+    )
+    step.apply(conn)
+    conn.exec_driver_sql("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (step.version, step.name))
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """Apply pending migrations in order, each in its own transaction. Returns the schema version."""
+    version = await get_schema_version(engine)
+    for step in MIGRATIONS:
+        if step.version <= version:
+            continue
+        async with engine.connect() as conn:
+            # драйвер sqlite3 сам не открывает транзакцию для DDL — открываем явно
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                await conn.run_sync(_apply, step)
+            except Exception:
+                await conn.rollback()
+                raise
+            await conn.commit()
+        logger.info("Миграция БД {}: {}", step.version, step.name)
+        version = step.version
+    return version
@@ -1,18 +1,129 @@
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import BigInteger, DateTime, Integer, String
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.base import Base
 
 
+# Статусы пользователя для рассылок: blocked — заблокировал бота, deactivated — аккаунт удалён или чат не найден
+USER_ACTIVE = "active"
+USER_BLOCKED = "blocked"
+USER_DEACTIVATED = "deactivated"
+
+
 class User(Base):
-    """User model: telegram_id, username, date joined, deep_link (source link if came via deep link)."""
+    """
+    User model: telegram_id, username, date joined, deep_link (source link if came via deep link),
+    delivery status (active/blocked/deactivated) and time of the last delivery error.
+    """
 
     __tablename__ = "users"
+    # выбор получателей рассылки (status = 'active') читается только из индекса
+    __table_args__ = (Index("ix_users_status_telegram_id", "status", "telegram_id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    deep_link: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+    status: Mapped[str] = mapped_column(
+        String(16), default=USER_ACTIVE, server_default=USER_ACTIVE, nullable=False
+    )
+    last_error_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class MediaFileId(Base):
+    """Telegram file_id of an uploaded local image, keyed by file path and content hash."""
+
+    __tablename__ = "media_file_ids"
+    __table_args__ = (UniqueConstraint("path", "file_hash", name="uq_media_file_ids_path_hash"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    file_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Статусы рассылки
+BROADCAST_NEW = "new"  # создана, сообщение прогресса админу ещё не отправлено — исполнитель её не берёт
+BROADCAST_RUNNING = "running"
+BROADCAST_PAUSED = "paused"
+BROADCAST_CANCELLED = "cancelled"
+BROADCAST_DONE = "done"
+
+# Статусы доставки получателю
+DELIVERY_PENDING = "pending"
+DELIVERY_SENT = "sent"
+DELIVERY_FAILED = "failed"
+
+
+class BroadcastJob(Base):
+    """Broadcast job: text, status, counters and the admin message used for progress."""
+
+    __tablename__ = "broadcast_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default=BROADCAST_RUNNING, nullable=False, index=True)
+    admin_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    status_message_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
-    deep_link: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class BroadcastDelivery(Base):
+    """Per-recipient delivery status of a broadcast job."""
+
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (Index("ix_broadcast_deliveries_job_status", "job_id", "status"),)
+
+    job_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("broadcast_jobs.id", ondelete="CASCADE"), primary_key=True
+    )
+    telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), default=DELIVERY_PENDING, nullable=False)
+
+
+class UserStat(Base):
+    """Counter of users per deep link ('' = без ссылки); total is the sum of all rows."""
+
+    __tablename__ = "user_stats"
+
+    deep_link: Mapped[str] = mapped_column(String(255), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class DeepLinkDaily(Base):
+    """New users per day (UTC) and deep link ('' = без ссылки): rollup for today/7/30-day stats."""
+
+    __tablename__ = "deep_link_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    deep_link: Mapped[str] = mapped_column(String(255), primary_key=True)
+    new_users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class FsmRecord(Base):
+    """FSM state and JSON data per storage key; expires_at is unix time (NULL = never)."""
+
+    __tablename__ = "fsm_storage"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    data: Mapped[str | None] = mapped_column(Text, nullable=True)
+    expires_at: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+
+
+class MediaGroupMessages(Base):
+    """Message ids of the last media group sent to a chat (comma-separated), deleted on navigation."""
+
+    __tablename__ = "media_group_messages"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    message_ids: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
@@ -1,3 +1,6 @@
+import asyncio
+import html
+
 from aiogram import Bot, F, Router
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -6,16 +9,23 @@ from aiogram.types import CallbackQuery, Message
 from app.core.config_aiogram import is_admin
 from app.data.deep_links_loader import get_deep_links_with_names
 from app.data.loader import get_welcome
-from app.database.crud.user import (
-    get_all_telegram_ids,
-    get_all_users,
-    get_users_count,
-    get_users_count_by_deep_link,
-)
+from app.data.watcher import content_watcher
+from app.database.crud.broadcast import get_active_broadcast_jobs
+from app.database.crud.user import get_all_users
 from app.database.db_session import AsyncSessionLocal
+from app.database.models import BROADCAST_CANCELLED, BROADCAST_PAUSED, BROADCAST_RUNNING
 from app.keyboards.callback_data import AdminCallbackData
-from app.keyboards.main_kb import get_admin_keyboard, get_menu_keyboard
+from app.keyboards.main_kb import (
+    get_admin_keyboard,
+    get_broadcast_jobs_keyboard,
+    get_menu_keyboard,
+    get_profile_keyboard,
+)
 from app.states import BroadcastStates
+from app.utils.broadcast import broadcast_worker, start_broadcast
+from app.utils.export import export_users_csv
+from app.utils.profiler import Profile, profile_document, profiler
+from app.utils.stats import user_stats
 from loguru import logger
 
 router = Router(name="admin")
@@ -99,6 +109,148 @@ async def admin_users_list(callback: CallbackQuery) -> None:
             await callback.message.answer(chunk)
 
 
+@router.callback_query(AdminCallbackData.filter(F.action.in_({"users_export", "users_export_gz"})))
+async def admin_users_export(callback: CallbackQuery, callback_data: AdminCallbackData) -> None:
+    """Send all users as a single CSV (or CSV.gz) document streamed from DB."""
+    if callback.from_user is None or callback.message is None:
+        return
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Доступ запрещён.", show_alert=True)
+        return
+    await callback.answer("Готовлю файл…")
+    compress = callback_data.action == "users_export_gz"
+    logger.info(
+        "Админ запросил выгрузку пользователей: gzip={}, telegram_id={}, username={}",
+        compress,
+        callback.from_user.id,
+        callback.from_user.username or "—",
+    )
+    document, count = await export_users_csv(compress=compress)
+    try:
+        await callback.message.answer_document(
+            document=document,
+            caption=f"Пользователи: {count}",
+        )
+    except Exception as e:
+        logger.error("Не удалось отправить выгрузку пользователей: {}", e)
+        await callback.message.answer("Не удалось отправить файл выгрузки.")
+    finally:
+        document.file.close()
+
+
+_JOB_STATUS_NAMES = {BROADCAST_RUNNING: "идёт", BROADCAST_PAUSED: "на паузе"}
+_JOB_ACTIONS = {
+    "job_pause": BROADCAST_PAUSED,
+    "job_resume": BROADCAST_RUNNING,
+    "job_cancel": BROADCAST_CANCELLED,
+}
+
+
+@router.callback_query(AdminCallbackData.filter(F.action.in_({"jobs", *_JOB_ACTIONS})))
+async def admin_broadcast_jobs(callback: CallbackQuery, callback_data: AdminCallbackData) -> None:
+    """Show running/paused broadcasts; pause, resume or cancel a job."""
+    if callback.from_user is None or callback.message is None:
+        return
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Доступ запрещён.", show_alert=True)
+        return
+    action = callback_data.action
+    if action in _JOB_ACTIONS:
+        job = await broadcast_worker.set_status(callback_data.job_id, _JOB_ACTIONS[action])
+        logger.info(
+            "Админ изменил рассылку #{}: действие={}, telegram_id={}, username={}",
+            callback_data.job_id,
+            action,
+            callback.from_user.id,
+            callback.from_user.username or "—",
+        )
+        if job is None:
+            await callback.answer("Рассылка не найдена.")
+        elif job.status != _JOB_ACTIONS[action]:
+            await callback.answer("Рассылка уже завершена.")
+        else:
+            await callback.answer("Готово.")
+    else:
+        await callback.answer()
+    async with AsyncSessionLocal() as session:
+        jobs = await get_active_broadcast_jobs(session)
+    if jobs:
+        lines = [
+            f"#{job.id} ({_JOB_STATUS_NAMES.get(job.status, job.status)}): "
+            f"обработано {job.sent + job.failed} из {job.total}, ошибок {job.failed}"
+            for job in jobs
+        ]
+        text = "Рассылки в работе:\n\n" + "\n".join(lines)
+    else:
+        text = "Активных рассылок нет."
+    keyboard = get_broadcast_jobs_keyboard(jobs)
+    try:
+        if callback.message.photo:
+            await callback.message.edit_caption(caption=text, reply_markup=keyboard)
+        else:
+            await callback.message.edit_text(text=text, reply_markup=keyboard)
+    except Exception as e:
+        logger.error("Не удалось отредактировать сообщение админки: {}", e)
+
+
+# фоновые сеансы профилирования (ссылка нужна, чтобы задачу не собрал GC)
+_profile_tasks: set[asyncio.Task] = set()
+
+
+async def _send_profile(bot: Bot, chat_id: int, seconds: int, updates: int) -> None:
+    try:
+        profile: Profile = await profiler.run(seconds=seconds, updates=updates)
+        await bot.send_document(
+            chat_id=chat_id,
+            document=profile_document(profile),
+            caption="Collapsed stacks: откройте в speedscope.app или flamegraph.pl",
+        )
+        await bot.send_message(chat_id=chat_id, text=f"<pre>{html.escape(profile.summary())}</pre>")
+    except Exception as e:
+        logger.exception("Профилирование не удалось: {}", e)
+        await bot.send_message(chat_id=chat_id, text="Профилирование не удалось (см. лог).")
+
+
+@router.callback_query(AdminCallbackData.filter(F.action.in_({"profile", "profile_seconds", "profile_updates"})))
+async def admin_profile(callback: CallbackQuery, callback_data: AdminCallbackData, bot: Bot) -> None:
+    """Choose and start a sampling profiler session; the result is sent as a document when it ends."""
+    if callback.from_user is None or callback.message is None:
+        return
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Доступ запрещён.", show_alert=True)
+        return
+    action = callback_data.action
+    if action == "profile":
+        await callback.answer()
+        text = "Профилирование: сэмплы стека обработчиков за выбранное время или число обновлений."
+    elif profiler.active:
+        await callback.answer("Профилирование уже идёт.", show_alert=True)
+        return
+    else:
+        seconds = callback_data.count if action == "profile_seconds" else 0
+        updates = callback_data.count if action == "profile_updates" else 0
+        logger.info(
+            "Админ запустил профилирование: секунд={}, обновлений={}, telegram_id={}, username={}",
+            seconds,
+            updates,
+            callback.from_user.id,
+            callback.from_user.username or "—",
+        )
+        task = asyncio.create_task(_send_profile(bot, callback.message.chat.id, seconds, updates))
+        _profile_tasks.add(task)
+        task.add_done_callback(_profile_tasks.discard)
+        await callback.answer("Профилирование запущено.")
+        limit = f"{seconds} с" if seconds else f"{updates} обновлений"
+        text = f"Профилирование запущено ({limit}). Результат придёт отдельным сообщением."
+    try:
+        if callback.message.photo:
+            await callback.message.edit_caption(caption=text, reply_markup=get_profile_keyboard())
+        else:
+            await callback.message.edit_text(text=text, reply_markup=get_profile_keyboard())
+    except Exception as e:
+        logger.error("Не удалось отредактировать сообщение админки: {}", e)
+
+
 @router.callback_query(AdminCallbackData.filter())
 async def admin_callback(callback: CallbackQuery, callback_data: AdminCallbackData) -> None:
     """Handle admin panel: show panel or back to main menu (broadcast handled above)."""
@@ -117,17 +269,18 @@ async def admin_callback(callback: CallbackQuery, callback_data: AdminCallbackDa
     )
     text: str
     if action == "panel":
-        async with AsyncSessionLocal() as session:
-            count = await get_users_count(session)
-            by_link = await get_users_count_by_deep_link(session)
+        count = user_stats.total
+        by_link = user_stats.by_deep_link()
         link_names = {item["slug"]: item["name"] for item in get_deep_links_with_names()}
         stats_lines = [f"Пользователей: {count}"]
         for deep_link_val, cnt in by_link:
+            day, week, month = user_stats.periods(deep_link_val)
+            periods = f"сегодня {day}, 7 дн. {week}, 30 дн. {month}"
             if deep_link_val is None:
-                stats_lines.append(f"Без ссылки: {cnt}")
+                stats_lines.append(f"Без ссылки: {cnt} ({periods})")
             else:
                 name = link_names.get(deep_link_val, deep_link_val)
-                stats_lines.append(f"По ссылке {deep_link_val} ({name}): {cnt}")
+                stats_lines.append(f"По ссылке {deep_link_val} ({name}): {cnt} ({periods})")
         text = "Админ панель.\n\n" + "\n".join(stats_lines) + "\n\nВыберите действие."
         keyboard = get_admin_keyboard()
     elif action == "back":
@@ -145,6 +298,24 @@ async def admin_callback(callback: CallbackQuery, callback_data: AdminCallbackDa
         logger.error("Не удалось отредактировать сообщение админки: {}", e)
 
 
+@router.message(Command("reload"))
+async def admin_reload_content(message: Message) -> None:
+    """Force reload of sections.yaml and deep_links.yaml without restarting the bot."""
+    if message.from_user is None or not is_admin(message.from_user.id):
+        return
+    logger.info(
+        "Админ запросил перезагрузку контента: telegram_id={}, username={}",
+        message.from_user.id,
+        message.from_user.username or "—",
+    )
+    results = await content_watcher.reload(force=True)
+    lines = [
+        f"{name}: " + ("загружен" if ok else "ошибка, оставлена прежняя версия (см. лог)")
+        for name, ok in results.items()
+    ]
+    await message.answer("Перезагрузка контента.\n\n" + ("\n".join(lines) or "Слежение за контентом не запущено."))
+
+
 @router.message(Command("cancel"), StateFilter(BroadcastStates.wait_text))
 async def admin_broadcast_cancel(message: Message, state: FSMContext) -> None:
     """Cancel broadcast and clear state."""
@@ -160,7 +331,7 @@ async def admin_broadcast_cancel(message: Message, state: FSMContext) -> None:
 
 @router.message(StateFilter(BroadcastStates.wait_text))
 async def admin_broadcast_send(message: Message, state: FSMContext, bot: Bot) -> None:
-    """Send broadcast to all users from DB. Only for admins. Error handling per user."""
+    """Create a persistent broadcast job for all users; the background worker delivers it. Only for admins."""
     if message.from_user is None:
         return
     if not is_admin(message.from_user.id):
@@ -171,24 +342,11 @@ async def admin_broadcast_send(message: Message, state: FSMContext, bot: Bot) ->
         await message.answer("Текст не может быть пустым. Введите текст рассылки или /cancel для отмены.")
         return
     await state.clear()
-    async with AsyncSessionLocal() as session:
-        user_ids = await get_all_telegram_ids(session)
-    total = len(user_ids)
+    job = await start_broadcast(bot, admin_chat_id=message.chat.id, text=text)
     logger.info(
-        "Админ отправил рассылку: telegram_id={}, username={}, получателей={}",
+        "Админ отправил рассылку #{}: telegram_id={}, username={}, получателей={}",
+        job.id,
         message.from_user.id,
         message.from_user.username or "—",
-        total,
-    )
-    sent = 0
-    failed = 0
-    for uid in user_ids:
-        try:
-            await bot.send_message(chat_id=uid, text=text)
-            sent += 1
-        except Exception as e:
-            failed += 1
-            logger.warning("Рассылка не доставлена пользователю {}: {}", uid, e)
-    await message.answer(
-        f"Рассылка завершена. Отправлено: {sent} из {total}. Ошибок: {failed}."
+        job.total,
     )
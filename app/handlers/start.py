@@ -1,15 +1,15 @@
 from aiogram import Bot, Router
 from aiogram.filters import Command
-from aiogram.types import FSInputFile, InputMediaPhoto, Message
+from aiogram.types import InputMediaPhoto, Message
 
 from loguru import logger
 
 from app.core.config_aiogram import is_admin
 from app.data.deep_links_loader import get_valid_deep_link_slugs
-from app.data.loader import get_info_images, get_info_text, get_welcome
-from app.database.crud.user import get_or_create_user
-from app.database.db_session import AsyncSessionLocal
+from app.data.loader import get_info_images, get_info_text, get_welcome, get_welcome_image_path
 from app.keyboards.main_kb import get_menu_keyboard
+from app.utils.media_cache import photo_input, remember_photos
+from app.utils.user_registry import user_registry
 
 router = Router(name="start")
 
@@ -30,35 +30,30 @@ def _parse_start_payload(text: str | None) -> str | None:
 
 @router.message(Command("start"))
 async def cmd_start(message: Message) -> None:
-    """Save user to DB (with deep_link if came via valid deep link), send welcome and main menu."""
+    """Register user (with deep_link if came via valid deep link; written to DB in background), send welcome and main menu."""
     user = message.from_user
     if user is None:
         return
     deep_link = _parse_start_payload(message.text)
-    logger.info(
+    logger.bind(sample="start").info(
         "Пользователь запустил бота: telegram_id={}, username={}, deep_link={}",
         user.id,
         user.username or "—",
         deep_link or "—",
     )
-    async with AsyncSessionLocal() as session:
-        await get_or_create_user(
-            session,
-            telegram_id=user.id,
-            username=user.username,
-            deep_link=deep_link,
-        )
+    user_registry.register(user.id, user.username, deep_link=deep_link)
     welcome = get_welcome()
     text = welcome.get("text") or "Добро пожаловать! Выберите раздел в меню ниже."
-    image_path = welcome.get("image_path") or ""
+    image_path = get_welcome_image_path()
     image_url = welcome.get("image_url") or ""
     admin = is_admin(user.id)
     keyboard = get_menu_keyboard(None, is_admin=admin)
 
     if image_path:
         try:
-            photo = FSInputFile(image_path)
-            await message.answer_photo(photo=photo, caption=text, reply_markup=keyboard)
+            photo = await photo_input(image_path)
+            sent = await message.answer_photo(photo=photo, caption=text, reply_markup=keyboard)
+            await remember_photos([image_path], [sent])
         except Exception:
             await message.answer(text=text, reply_markup=keyboard)
     elif image_url:
@@ -67,19 +62,12 @@ async def cmd_start(message: Message) -> None:
         await message.answer(text=text, reply_markup=keyboard)
 
 
-def _photo_media(source: str):
-    """URL — строка, иначе FSInputFile по пути."""
-    if (source or "").strip().lower().startswith(("http://", "https://")):
-        return source
-    return FSInputFile(source)
-
-
 @router.message(Command("info"))
 async def cmd_info(message: Message, bot: Bot) -> None:
     """Show О нас text and optional images from sections.yaml, main menu keyboard."""
     user = message.from_user
     if user:
-        logger.info(
+        logger.bind(sample="info").info(
             "Пользователь открыл «О нас»: telegram_id={}, username={}",
             user.id,
             user.username or "—",
@@ -92,12 +80,14 @@ async def cmd_info(message: Message, bot: Bot) -> None:
     if len(images) == 0:
         await message.answer(text=text)
     elif len(images) == 1:
-        media = _photo_media(images[0])
-        await message.answer_photo(
+        media = await photo_input(images[0])
+        sent = await message.answer_photo(
             photo=media,
             caption=text
         )
+        await remember_photos(images, [sent])
     else:
-        media_list = [InputMediaPhoto(media=_photo_media(src)) for src in images]
-        await bot.send_media_group(chat_id=message.chat.id, media=media_list)
+        media_list = [InputMediaPhoto(media=await photo_input(src)) for src in images]
+        sent_group = await bot.send_media_group(chat_id=message.chat.id, media=media_list)
+        await remember_photos(images, sent_group)
         await message.answer(text=text)
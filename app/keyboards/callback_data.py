@@ -9,6 +9,10 @@ class MenuCallbackData(CallbackData, prefix="menu"):
 
 
 class AdminCallbackData(CallbackData, prefix="admin"):
-    """Callback data for admin panel: panel, broadcast, users_list, back."""
+    """Callback data for admin panel: panel, broadcast, users list/export, back, broadcast job control, profiling."""
 
-    action: str  # "panel" | "broadcast" | "users_list" | "back"
+    # "panel" | "broadcast" | "users_list" | "users_export" | "users_export_gz" | "back"
+    # | "jobs" | "job_pause" | "job_resume" | "job_cancel" | "profile" | "profile_seconds" | "profile_updates"
+    action: str
+    job_id: int = 0  # for job_* actions
+    count: int = 0  # for profile_* actions: seconds or updates
@@ -1,22 +1,24 @@
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.data.loader import get_children_for_path, get_parent_path
+from app.data.loader import get_children_for_path, get_parent_path, get_section
+from app.database.models import BROADCAST_PAUSED, BroadcastJob
 from app.keyboards.callback_data import AdminCallbackData, MenuCallbackData
 
 
-def get_menu_keyboard(path: str | None, is_admin: bool = False) -> InlineKeyboardMarkup:
+def build_menu_keyboard(
+    path: str,
+    children: list[tuple[str, str]],
+    parent_path: str,
+    is_admin: bool = False,
+) -> InlineKeyboardMarkup:
     """
-    Build inline keyboard for the given path.
-    path None or '' = main menu (5 sections + optional Admin panel); otherwise children + Back button.
+    Build inline keyboard from (id, title) pairs of the children.
+    path '' = main menu (sections + optional Admin panel); otherwise children + Back button.
     """
-    path = path or ""
     builder = InlineKeyboardBuilder()
-    children = get_children_for_path(path)
 
-    for node in children:
-        node_id = node.get("id", "")
-        title = node.get("title", node_id)
+    for node_id, title in children:
         builder.button(
             text=title,
             callback_data=MenuCallbackData(action="open", path=node_id),
@@ -28,7 +30,6 @@ def get_menu_keyboard(path: str | None, is_admin: bool = False) -> InlineKeyboar
             callback_data=AdminCallbackData(action="panel"),
         )
 
-    parent_path = get_parent_path(path)
     if path != "":
         builder.button(
             text="Назад",
@@ -39,20 +40,99 @@ def get_menu_keyboard(path: str | None, is_admin: bool = False) -> InlineKeyboar
     return builder.as_markup()
 
 
+def get_menu_keyboard(path: str | None, is_admin: bool = False) -> InlineKeyboardMarkup:
+    """Return prebuilt inline keyboard for the given path (built once at content load)."""
+    path = path or ""
+    node = get_section(path)
+    if node is not None:
+        return node.admin_keyboard if is_admin else node.keyboard
+    children = [(child.path, child.title) for child in get_children_for_path(path)]
+    return build_menu_keyboard(path, children, get_parent_path(path), is_admin=is_admin)
+
+
 def get_admin_keyboard() -> InlineKeyboardMarkup:
-    """Admin panel: Рассылка, Список пользователей, Назад to main menu."""
+    """Admin panel: Рассылка, Рассылки в работе, Список пользователей, Выгрузка CSV, Профилирование, Назад to main menu."""
     builder = InlineKeyboardBuilder()
     builder.button(
         text="Рассылка",
         callback_data=AdminCallbackData(action="broadcast"),
     )
+    builder.button(
+        text="Рассылки в работе",
+        callback_data=AdminCallbackData(action="jobs"),
+    )
     builder.button(
         text="Список пользователей",
         callback_data=AdminCallbackData(action="users_list"),
     )
+    builder.button(
+        text="Выгрузка CSV",
+        callback_data=AdminCallbackData(action="users_export"),
+    )
+    builder.button(
+        text="Выгрузка CSV (gzip)",
+        callback_data=AdminCallbackData(action="users_export_gz"),
+    )
+    builder.button(
+        text="Профилирование",
+        callback_data=AdminCallbackData(action="profile"),
+    )
     builder.button(
         text="Назад",
         callback_data=AdminCallbackData(action="back"),
     )
     builder.adjust(1)
     return builder.as_markup()
+
+
+def get_broadcast_jobs_keyboard(jobs: list[BroadcastJob]) -> InlineKeyboardMarkup:
+    """Пауза/продолжение и отмена для каждой активной рассылки, Назад в админ панель."""
+    builder = InlineKeyboardBuilder()
+    sizes: list[int] = []
+    for job in jobs:
+        if job.status == BROADCAST_PAUSED:
+            builder.button(
+                text=f"▶ Продолжить #{job.id}",
+                callback_data=AdminCallbackData(action="job_resume", job_id=job.id),
+            )
+        else:
+            builder.button(
+                text=f"⏸ Пауза #{job.id}",
+                callback_data=AdminCallbackData(action="job_pause", job_id=job.id),
+            )
+        builder.button(
+            text=f"✖ Отменить #{job.id}",
+            callback_data=AdminCallbackData(action="job_cancel", job_id=job.id),
+        )
+        sizes.append(2)
+    builder.button(
+        text="Назад",
+        callback_data=AdminCallbackData(action="panel"),
+    )
+    builder.adjust(*sizes, 1)
+    return builder.as_markup()
+
+
+PROFILE_SECONDS = (10, 30, 60)
+PROFILE_UPDATES = (100, 1000)
+
+
+def get_profile_keyboard() -> InlineKeyboardMarkup:
+    """Профилирование на N секунд или N обновлений, Назад в админ панель."""
+    builder = InlineKeyboardBuilder()
+    for seconds in PROFILE_SECONDS:
+        builder.button(
+            text=f"{seconds} с",
+            callback_data=AdminCallbackData(action="profile_seconds", count=seconds),
+        )
+    for updates in PROFILE_UPDATES:
+        builder.button(
+            text=f"{updates} обновлений",
+            callback_data=AdminCallbackData(action="profile_updates", count=updates),
+        )
+    builder.button(
+        text="Назад",
+        callback_data=AdminCallbackData(action="panel"),
+    )
+    builder.adjust(len(PROFILE_SECONDS), len(PROFILE_UPDATES), 1)
+    return builder.as_markup()
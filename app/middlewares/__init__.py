@@ -0,0 +1,3 @@
+from app.middlewares.update_lanes import UpdateLanesMiddleware, setup_update_lanes
+
+__all__ = ["UpdateLanesMiddleware", "setup_update_lanes"]
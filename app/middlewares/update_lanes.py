@@ -0,0 +1,93 @@
+"""
+Очередь обновлений по чатам: обновления одного чата обрабатываются строго по порядку, общее число
+одновременно обрабатываемых обновлений ограничено. Если пользователь быстро нажимает кнопки меню,
+устаревшие нажатия (на то же сообщение) пропускаются — на них только отвечается callback.answer.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import CallbackQuery, TelegramObject, Update
+from loguru import logger
+
+from app.keyboards.callback_data import MenuCallbackData
+
+_MENU_PREFIX = f"{MenuCallbackData.__prefix__}{MenuCallbackData.__separator__}"
+
+
+class _Lane:
+    __slots__ = ("lock", "users", "latest")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # сколько обновлений чата ждут или обрабатываются
+        self.users = 0
+        # message_id -> update_id последнего нажатия меню на этом сообщении
+        self.latest: dict[int, int] = {}
+
+
+def _menu_message_id(callback: CallbackQuery | None) -> int | None:
+    if callback is None or callback.message is None or not (callback.data or "").startswith(_MENU_PREFIX):
+        return None
+    return callback.message.message_id
+
+
+class UpdateLanesMiddleware(BaseMiddleware):
+    """Outer update middleware: per-chat ordering, a global concurrency limit and stale menu click coalescing."""
+
+    def __init__(self, concurrency: int):
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lanes: dict[int, _Lane] = {}
+        self.dropped = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        context = UserContextMiddleware.resolve_event_context(event)
+        chat_id = context.chat_id or context.user_id or 0
+        callback = event.callback_query
+        menu_message_id = _menu_message_id(callback)
+
+        # до первого await: место в очереди чата занимается в порядке поступления обновлений
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _Lane()
+        lane.users += 1
+        if menu_message_id is not None:
+            lane.latest[menu_message_id] = event.update_id
+        try:
+            async with lane.lock:
+                if menu_message_id is not None:
+                    if lane.latest.get(menu_message_id) != event.update_id:
+                        self.dropped += 1
+                        logger.debug("Пропущено устаревшее нажатие меню: chat_id={}", chat_id)
+                        await data["bot"].answer_callback_query(callback.id)
+                        return None
+                    del lane.latest[menu_message_id]
+                async with self._semaphore:
+                    return await handler(event, data)
+        finally:
+            lane.users -= 1
+            if lane.users == 0:
+                del self._lanes[chat_id]
+
+
+def setup_update_lanes(dp: Dispatcher, concurrency: int) -> UpdateLanesMiddleware:
+    """
+    Register the middleware as the outermost one: the built-in FSM middleware reads the state
+    before the handler runs, so it has to wait for the previous update of the chat too.
+    """
+    builtin = list(dp.update.outer_middleware)
+    for middleware in builtin:
+        dp.update.outer_middleware.unregister(middleware)
+    lanes = dp.update.outer_middleware.register(UpdateLanesMiddleware(concurrency))
+    for middleware in builtin:
+        dp.update.outer_middleware.register(middleware)
+    return lanes
@@ -0,0 +1,427 @@
+"""Движок рассылки: ограниченная параллельность, общий token bucket под лимит Telegram, учёт RetryAfter."""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from loguru import logger
+
+from app.database.crud.broadcast import (
+    activate_broadcast_job,
+    create_broadcast_job,
+    delete_finished_deliveries,
+    get_broadcast_job,
+    get_broadcast_jobs_by_status,
+    get_pending_recipients,
+    save_delivery_results,
+    set_broadcast_job_status,
+)
+from app.database.db_session import AsyncSessionLocal
+from app.database.models import (
+    BROADCAST_CANCELLED,
+    BROADCAST_DONE,
+    BROADCAST_RUNNING,
+    USER_BLOCKED,
+    USER_DEACTIVATED,
+    BroadcastJob,
+)
+from app.utils.metrics import BROADCAST_ETA, BROADCAST_FAILED, BROADCAST_SENT, BROADCAST_TOTAL
+
+# Telegram допускает ~30 сообщений в секунду на бота; оставляем запас
+BROADCAST_RATE = 28.0
+BROADCAST_CONCURRENCY = 16
+BROADCAST_MAX_RETRIES = 3
+PROGRESS_INTERVAL = 5.0
+# Получателей за один проход; после каждого прохода статусы сохраняются в БД
+WORKER_BATCH_SIZE = 100
+# Как часто исполнитель проверяет БД на новые/возобновлённые рассылки
+# (их могут создать обработчики в других процессах бота)
+WORKER_POLL_INTERVAL = 5.0
+
+
+class TokenBucket:
+    """Token bucket: не больше rate операций в секунду, всплеск до capacity."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def drain(self) -> None:
+        """Обнулить накопленные токены (после паузы по RetryAfter — без всплеска)."""
+        self._tokens = 0
+        self._updated = time.monotonic()
+
+
+@dataclass
+class BroadcastStats:
+    """Прогресс рассылки."""
+
+    total: int
+    sent: int = 0
+    failed: int = 0
+    # Сколько было обработано до текущего запуска (при продолжении рассылки) — не учитывается в скорости
+    offset: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.done
+
+    @property
+    def eta(self) -> float | None:
+        """Оценка оставшегося времени в секундах; None, пока нет данных."""
+        elapsed = time.monotonic() - self.started_at
+        processed = self.done - self.offset
+        if processed <= 0 or elapsed <= 0:
+            return None
+        return self.remaining / (processed / elapsed)
+
+
+def inactive_status(error: TelegramAPIError) -> str | None:
+    """User status for an error that will repeat on every message (blocked, deleted account, no chat); else None."""
+    message = error.message.lower()
+    if isinstance(error, TelegramForbiddenError):
+        return USER_DEACTIVATED if "deactivated" in message else USER_BLOCKED
+    if isinstance(error, TelegramBadRequest) and "chat not found" in message:
+        return USER_DEACTIVATED
+    return None
+
+
+def export_progress(job_id: int, stats: BroadcastStats | None) -> None:
+    """Update broadcast gauges of the job; None removes them."""
+    gauges = (BROADCAST_TOTAL, BROADCAST_SENT, BROADCAST_FAILED, BROADCAST_ETA)
+    if stats is None:
+        for gauge in gauges:
+            gauge.remove(job=job_id)
+        return
+    eta = stats.eta
+    for gauge, value in zip(gauges, (stats.total, stats.sent, stats.failed, -1 if eta is None else eta)):
+        gauge.set(value, job=job_id)
+
+
+def format_progress(stats: BroadcastStats) -> str:
+    """Текст прогресса для админа."""
+    eta = stats.eta
+    eta_text = "—" if eta is None else f"{int(eta // 60)} мин {int(eta % 60)} с"
+    return (
+        f"Рассылка: отправлено {stats.sent}, ошибок {stats.failed}, "
+        f"осталось {stats.remaining} из {stats.total}. Осталось времени: ~{eta_text}"
+    )
+
+
+ProgressCallback = Callable[[BroadcastStats], Awaitable[None]]
+ResultCallback = Callable[[int, bool], None]
+
+
+async def report_progress(stats: BroadcastStats, on_progress: ProgressCallback, interval: float) -> None:
+    """Вызывать on_progress раз в interval секунд, пока задачу не отменят."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await on_progress(stats)
+        except Exception as e:
+            logger.debug("Не удалось обновить прогресс рассылки: {}", e)
+
+
+class Broadcaster:
+    """Параллельная рассылка текста списку chat_id с общим ограничением скорости."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float = BROADCAST_RATE,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        progress_interval: float = PROGRESS_INTERVAL,
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self._bucket = TokenBucket(rate)
+        self._stopped = False
+        # chat_id -> статус пользователя (blocked/deactivated) по ошибкам доставки; забирает вызывающий
+        self.inactive: dict[int, str] = {}
+        # Сброшен — весь конвейер стоит (RetryAfter)
+        self._running = asyncio.Event()
+        self._running.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def stop(self) -> None:
+        """Не брать новых получателей; уже начатые отправки завершаются."""
+        self._stopped = True
+
+    async def _pause(self, seconds: float) -> None:
+        if not self._running.is_set():
+            return
+        self._running.clear()
+        logger.warning("Рассылка приостановлена на {} с (RetryAfter)", seconds)
+        await asyncio.sleep(seconds)
+        self._bucket.drain()
+        self._running.set()
+
+    async def _deliver(self, chat_id: int, text: str) -> bool:
+        """Отправить одно сообщение; True — доставлено."""
+        for _ in range(BROADCAST_MAX_RETRIES + 1):
+            await self._running.wait()
+            await self._bucket.acquire()
+            await self._running.wait()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                return True
+            except TelegramRetryAfter as e:
+                await self._pause(e.retry_after)
+            except TelegramAPIError as e:
+                status = inactive_status(e)
+                if status is not None:
+                    self.inactive[chat_id] = status
+                logger.bind(sample="broadcast_failed").warning(
+                    "Рассылка не доставлена пользователю {}: {}", chat_id, e
+                )
+                return False
+        return False
+
+    async def run(
+        self,
+        chat_ids: Iterable[int],
+        text: str,
+        on_progress: ProgressCallback | None = None,
+        on_result: ResultCallback | None = None,
+        stats: BroadcastStats | None = None,
+    ) -> BroadcastStats:
+        """
+        Разослать text всем chat_ids; on_progress вызывается раз в progress_interval секунд,
+        on_result — после каждого получателя. stats передаётся, чтобы продолжить общий счёт.
+        """
+        ids = list(chat_ids)
+        if stats is None:
+            stats = BroadcastStats(total=len(ids))
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for chat_id in ids:
+            queue.put_nowait(chat_id)
+
+        async def worker() -> None:
+            while not self._stopped:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                ok = await self._deliver(chat_id, text)
+                if ok:
+                    stats.sent += 1
+                else:
+                    stats.failed += 1
+                if on_result is not None:
+                    on_result(chat_id, ok)
+
+        report_task = (
+            asyncio.create_task(report_progress(stats, on_progress, self.progress_interval))
+            if on_progress is not None
+            else None
+        )
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(ids)))))
+        finally:
+            if report_task is not None:
+                report_task.cancel()
+        return stats
+
+
+class BroadcastWorker:
+    """
+    Фоновый исполнитель рассылок из БД. При старте подхватывает незавершённые (running) задачи
+    и продолжает с недоставленных получателей; пауза/отмена останавливают текущий проход.
+    """
+
+    def __init__(self) -> None:
+        self._bot: Bot | None = None
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+        self._current: tuple[int, Broadcaster] | None = None
+
+    def start(self, bot: Bot) -> None:
+        """Запустить фоновую задачу (один раз при старте бота)."""
+        self._bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Сообщить о новой или возобновлённой рассылке."""
+        self._wake.set()
+
+    async def set_status(self, job_id: int, status: str) -> BroadcastJob | None:
+        """
+        Сменить статус задачи (пауза/продолжение/отмена) и остановить или разбудить исполнителя.
+        Если переход не разрешён (задача уже завершена), у возвращённой задачи прежний статус.
+        """
+        async with AsyncSessionLocal() as session:
+            job = await set_broadcast_job_status(session, job_id, status)
+        if job is None or job.status != status:
+            return job
+        if status == BROADCAST_RUNNING:
+            self.wake()
+        elif status == BROADCAST_CANCELLED:
+            await self._purge_deliveries()
+        elif self._current is not None and self._current[0] == job_id:
+            self._current[1].stop()
+        return job
+
+    async def _purge_deliveries(self) -> None:
+        """Удалить строки получателей завершённых и отменённых рассылок — таблица не растёт с каждой рассылкой."""
+        try:
+            async with AsyncSessionLocal() as session:
+                deleted = await delete_finished_deliveries(session)
+        except Exception as e:
+            logger.warning("Не удалось удалить получателей завершённых рассылок: {}", e)
+            return
+        if deleted:
+            logger.debug("Удалено строк получателей завершённых рассылок: {}", deleted)
+
+    async def _loop(self) -> None:
+        # строки, оставшиеся от рассылок до перезапуска
+        await self._purge_deliveries()
+        while True:
+            self._wake.clear()
+            try:
+                async with AsyncSessionLocal() as session:
+                    jobs = await get_broadcast_jobs_by_status(session, BROADCAST_RUNNING)
+                for job in jobs:
+                    await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Ошибка исполнителя рассылок: {}", e)
+                jobs = []
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _edit_status(self, job: BroadcastJob, text: str) -> None:
+        if job.status_message_id is None:
+            return
+        try:
+            await self._bot.edit_message_text(
+                chat_id=job.admin_chat_id,
+                message_id=job.status_message_id,
+                text=text,
+            )
+        except Exception as e:
+            logger.debug("Не удалось обновить прогресс рассылки: {}", e)
+
+    async def _run_job(self, job: BroadcastJob) -> None:
+        logger.info("Рассылка #{}: старт/продолжение, обработано {} из {}", job.id, job.sent + job.failed, job.total)
+        broadcaster = Broadcaster(self._bot)
+        stats = BroadcastStats(total=job.total, sent=job.sent, failed=job.failed, offset=job.sent + job.failed)
+        self._current = (job.id, broadcaster)
+
+        async def on_progress(progress: BroadcastStats) -> None:
+            export_progress(job.id, progress)
+            await self._edit_status(job, f"#{job.id} " + format_progress(progress))
+
+        # один отчёт о прогрессе на всю задачу: проход по WORKER_BATCH_SIZE получателей короче PROGRESS_INTERVAL
+        report_task = asyncio.create_task(report_progress(stats, on_progress, broadcaster.progress_interval))
+        try:
+            while not broadcaster.stopped:
+                async with AsyncSessionLocal() as session:
+                    ids = await get_pending_recipients(session, job.id, WORKER_BATCH_SIZE)
+                if not ids:
+                    async with AsyncSessionLocal() as session:
+                        finished = await set_broadcast_job_status(session, job.id, BROADCAST_DONE)
+                    if finished is None or finished.status != BROADCAST_DONE:
+                        # пауза/отмена пришла после последней пачки — задача не завершена здесь
+                        break
+                    report_task.cancel()
+                    await self._purge_deliveries()
+                    summary = (
+                        f"Рассылка #{job.id} завершена. Отправлено: {stats.sent} из {stats.total}. "
+                        f"Ошибок: {stats.failed}."
+                    )
+                    await self._edit_status(job, summary)
+                    await self._bot.send_message(chat_id=job.admin_chat_id, text=summary)
+                    logger.info("Рассылка #{} завершена: отправлено {}, ошибок {}", job.id, stats.sent, stats.failed)
+                    return
+                sent_ids: list[int] = []
+                failed_ids: list[int] = []
+
+                def on_result(chat_id: int, ok: bool) -> None:
+                    (sent_ids if ok else failed_ids).append(chat_id)
+
+                try:
+                    await broadcaster.run(ids, job.text, on_result=on_result, stats=stats)
+                finally:
+                    inactive, broadcaster.inactive = broadcaster.inactive, {}
+                    async with AsyncSessionLocal() as session:
+                        await save_delivery_results(session, job.id, sent_ids, failed_ids, inactive)
+                    export_progress(job.id, stats)
+                # Пауза/отмена могла прийти из другого процесса
+                async with AsyncSessionLocal() as session:
+                    current = await get_broadcast_job(session, job.id)
+                if current is None or current.status != BROADCAST_RUNNING:
+                    broadcaster.stop()
+            async with AsyncSessionLocal() as session:
+                current = await get_broadcast_job(session, job.id)
+            status = current.status if current is not None else "—"
+            report_task.cancel()
+            await self._edit_status(job, f"#{job.id} ({status}) " + format_progress(stats))
+            logger.info("Рассылка #{} остановлена: статус {}", job.id, status)
+        finally:
+            report_task.cancel()
+            self._current = None
+            export_progress(job.id, None)
+
+
+broadcast_worker = BroadcastWorker()
+
+
+async def start_broadcast(bot: Bot, admin_chat_id: int, text: str) -> BroadcastJob:
+    """Создать задачу рассылки всем пользователям, отправить админу сообщение прогресса, разбудить исполнителя."""
+    async with AsyncSessionLocal() as session:
+        job = await create_broadcast_job(session, text=text, admin_chat_id=admin_chat_id)
+    # исполнитель берёт задачу только после того, как у неё есть сообщение прогресса
+    message_id = None
+    try:
+        status = await bot.send_message(
+            chat_id=admin_chat_id,
+            text=f"Рассылка #{job.id} запущена. Получателей: {job.total} (без заблокировавших бота).",
+        )
+        message_id = status.message_id
+    except Exception as e:
+        logger.warning("Рассылка #{} идёт без сообщения прогресса: {}", job.id, e)
+    async with AsyncSessionLocal() as session:
+        await activate_broadcast_job(session, job.id, message_id)
+    job.status_message_id = message_id
+    job.status = BROADCAST_RUNNING
+    broadcast_worker.wake()
+    return job
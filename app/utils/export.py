@@ -0,0 +1,68 @@
+"""Выгрузка пользователей в CSV: строки читаются из БД пачками и пишутся во временный файл."""
+import csv
+import gzip
+import io
+import tempfile
+from collections.abc import AsyncGenerator
+from datetime import datetime
+from typing import IO
+
+from aiogram import Bot
+from aiogram.types import InputFile
+
+from app.database.crud.user import iter_users_rows
+from app.database.db_session import AsyncSessionLocal
+
+# До этого размера файл держится в памяти, дальше — на диске
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+CSV_HEADER = ("id", "telegram_id", "username", "created_at", "deep_link")
+
+
+class TempFileInput(InputFile):
+    """InputFile поверх открытого бинарного файла: отправляется кусками, без чтения целиком в память."""
+
+    def __init__(self, file: IO[bytes], filename: str):
+        super().__init__(filename=filename)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+async def export_users_csv(compress: bool = False) -> tuple[TempFileInput, int]:
+    """
+    Write all users to a spooled temp file as CSV (optionally gzip).
+    Returns the document ready to send and the number of rows. Caller closes document.file.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+    raw: IO[bytes] = gzip.GzipFile(fileobj=spool, mode="wb") if compress else spool
+    # utf-8-sig: Excel корректно открывает кириллицу
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    try:
+        async with AsyncSessionLocal() as session:
+            async for rows in iter_users_rows(session):
+                writer.writerows(
+                    (
+                        user_id,
+                        telegram_id,
+                        username or "",
+                        created_at.strftime("%Y-%m-%d %H:%M:%S") if created_at else "",
+                        deep_link or "",
+                    )
+                    for user_id, telegram_id, username, created_at, deep_link in rows
+                )
+                count += len(rows)
+        text.flush()
+        text.detach()
+        if compress:
+            raw.close()
+    except BaseException:
+        spool.close()
+        raise
+    filename = f"users_{datetime.utcnow():%Y%m%d_%H%M%S}.csv" + (".gz" if compress else "")
+    return TempFileInput(spool, filename=filename), count
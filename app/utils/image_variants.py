@@ -0,0 +1,201 @@
+"""
+Подготовка локальных картинок разделов к отправке в Telegram: уменьшение до IMAGE_MAX_SIZE по длинной
+стороне, JPEG/WebP с заданным качеством, без EXIF; картинка, которой не нужно уменьшение и которая
+не становится меньше после пережатия, отправляется как есть. Варианты лежат в IMAGE_CACHE_DIR под хэшем
+содержимого оригинала и собираются в пуле процессов в фоне; пока вариант не готов (или Pillow
+не установлен), отправляется оригинал.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency
+    Image = None
+
+if TYPE_CHECKING:
+    from app.core.config_aiogram import Images
+    from app.data.loader import ContentSnapshot
+
+_EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+
+
+def variant_path(cache_dir: str, digest: str, max_size: int, image_format: str, quality: int) -> Path:
+    """Where the variant of an original with this sha256 is stored."""
+    return Path(cache_dir) / digest[:2] / f"{digest}_{max_size}_q{quality}.{_EXTENSIONS[image_format]}"
+
+
+def build_variant(source: str, cache_dir: str, max_size: int, image_format: str, quality: int) -> tuple[str, str]:
+    """
+    Runs in a pool process: hash the original, write the variant if missing. Returns (sha256, path to send):
+    an original that needs no resize and is not smaller after re-encoding is sent as is.
+    """
+    h = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    target = variant_path(cache_dir, digest, max_size, image_format, quality)
+    if target.exists():
+        return digest, str(target)
+    with Image.open(source) as original:
+        # поворот по EXIF Orientation до удаления метаданных
+        image = ImageOps.exif_transpose(original)
+        size = image.size
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "L") and image_format == "jpeg":
+            # прозрачность — на белый фон
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        # exif/icc не передаются — метаданные в вариант не попадают
+        image.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+    if image.size == size and buffer.tell() >= os.path.getsize(source):
+        # уменьшать нечего, а пережатие только теряет качество — отправляется оригинал
+        return digest, source
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(buffer.getbuffer())
+        os.replace(tmp, target)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return digest, str(target)
+
+
+def snapshot_images(snapshot: "ContentSnapshot", extra: Iterable[str] = ()) -> set[str]:
+    """Local image paths used by the content (URLs are skipped)."""
+    sources = {image for node in snapshot.nodes.values() for image in node.images}
+    sources.update(snapshot.info_images)
+    sources.update(extra)
+    return {source for source in sources if source and not source.lower().startswith(("http://", "https://"))}
+
+
+class ImageVariants:
+    """
+    Background builder and in-memory index of ready variants: original sha256 -> variant path.
+    Variants are built by one process (build=True); the others find finished files in the cache directory.
+    """
+
+    def __init__(self) -> None:
+        self.settings: "Images | None" = None
+        self.build = False
+        self._ready: dict[str, str] = {}
+        # path -> (mtime_ns, size) исходника, уже отправленного в пул
+        self._seen: dict[str, tuple[int, int]] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, settings: "Images", build: bool = True) -> None:
+        """
+        Включить подготовку картинок (без Pillow или при IMAGE_MAX_SIZE=0 — оригиналы).
+        build=False — только использовать готовые варианты (процессы-обработчики, кроме первого).
+        """
+        if not settings.enabled:
+            return
+        if Image is None:
+            if build:
+                logger.info("Pillow не установлен — картинки отправляются без подготовки")
+            return
+        self.settings = settings
+        self.build = build
+
+    def get(self, digest: str) -> str | None:
+        """Path of the ready variant for an original with this sha256, or None."""
+        variant = self._ready.get(digest)
+        if variant is not None or self.settings is None or self.build:
+            return variant
+        # вариант собирает другой процесс — ищем готовый файл в кэше
+        settings = self.settings
+        path = variant_path(str(settings.cache_dir), digest, settings.max_size, settings.format, settings.quality)
+        if not path.exists():
+            return None
+        self._ready[digest] = str(path)
+        return self._ready[digest]
+
+    def schedule(self, sources: Iterable[str]) -> None:
+        """Собрать в фоне варианты новых и изменившихся файлов; не блокирует event loop."""
+        if self.settings is None or not self.build:
+            return
+        pending = []
+        for source in sources:
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if self._seen.get(source) != stamp:
+                self._seen[source] = stamp
+                pending.append(source)
+        if not pending:
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.settings.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        task = asyncio.create_task(self._build(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _build(self, sources: list[str]) -> None:
+        loop = asyncio.get_running_loop()
+        settings = self.settings
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._pool,
+                    build_variant,
+                    source,
+                    str(settings.cache_dir),
+                    settings.max_size,
+                    settings.format,
+                    settings.quality,
+                )
+                for source in sources
+            ),
+            return_exceptions=True,
+        )
+        built = 0
+        for source, result in zip(sources, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, BrokenProcessPool) and self._pool is not None:
+                    # процесс пула упал — при следующей перезагрузке контента пул создаётся заново
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+                self._seen.pop(source, None)
+                logger.warning("Картинка {} отправляется без подготовки: {}", source, result)
+                continue
+            digest, variant = result
+            self._ready[digest] = variant
+            built += 1
+        logger.info("Подготовлено картинок: {} из {}", built, len(sources))
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+image_variants = ImageVariants()
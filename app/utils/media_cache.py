@@ -0,0 +1,88 @@
+"""
+Кэш Telegram file_id для локальных картинок: файл загружается один раз, дальше отправляется по file_id.
+Если для картинки готов уменьшенный вариант (image_variants), загружается он.
+"""
+import asyncio
+import hashlib
+import os
+
+from aiogram.types import FSInputFile, Message
+from loguru import logger
+
+from app.database.crud.media import get_media_file_id, save_media_file_id
+from app.database.db_session import AsyncSessionLocal
+from app.utils.image_variants import image_variants
+
+# path -> (mtime_ns, size, sha256) — хэш пересчитывается только при изменении файла
+_digests: dict[str, tuple[int, int, str]] = {}
+# (path, sha256) -> file_id
+_file_ids: dict[tuple[str, str], str] = {}
+
+
+def _is_url(source: str) -> bool:
+    return (source or "").strip().lower().startswith(("http://", "https://"))
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+async def _file_digest(path: str) -> str | None:
+    """Return sha256 of the file content; recomputed off the event loop when mtime or size change."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    digest = await asyncio.to_thread(_hash_file, path)
+    _digests[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+async def photo_input(source: str) -> str | FSInputFile:
+    """URL или закэшированный file_id — строка, иначе FSInputFile по пути (подготовленного варианта, если он готов)."""
+    if _is_url(source):
+        return source
+    digest = await _file_digest(source)
+    if digest is None:
+        return FSInputFile(source)
+    key = (source, digest)
+    file_id = _file_ids.get(key)
+    if file_id is None:
+        try:
+            async with AsyncSessionLocal() as session:
+                file_id = await get_media_file_id(session, source, digest)
+        except Exception as e:
+            logger.debug("Не удалось прочитать file_id из БД: {}", e)
+        if file_id is not None:
+            _file_ids[key] = file_id
+    if file_id is not None:
+        return file_id
+    variant = image_variants.get(digest)
+    return FSInputFile(variant if variant is not None else source)
+
+
+async def remember_photos(sources: list[str], messages: list[Message | bool]) -> None:
+    """Сохранить file_id загруженных локальных картинок (sources и messages — в одном порядке)."""
+    for source, message in zip(sources, messages):
+        if _is_url(source) or not isinstance(message, Message) or not message.photo:
+            continue
+        digest = _digests.get(source)
+        if digest is None:
+            continue
+        key = (source, digest[2])
+        if key in _file_ids:
+            continue
+        file_id = message.photo[-1].file_id
+        _file_ids[key] = file_id
+        try:
+            async with AsyncSessionLocal() as session:
+                await save_media_file_id(session, source, digest[2], file_id)
+        except Exception as e:
+            logger.warning("Не удалось сохранить file_id для {}: {}", source, e)
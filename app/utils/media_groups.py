@@ -0,0 +1,111 @@
+"""
+Хранилище id сообщений медиа-группы по chat_id (удаляются при смене раздела).
+Память ограничена (LRU + TTL); по желанию — копия в SQLite, чтобы пережить перезапуск.
+"""
+import os
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+from app.database.crud.media import (
+    delete_media_groups_before,
+    get_media_group_chat_ids,
+    pop_media_group,
+    save_media_group,
+)
+from app.database.db_session import AsyncSessionLocal
+
+# Telegram даёт боту удалить сообщение только в течение 48 часов — дольше хранить незачем
+DEFAULT_TTL = 48 * 60 * 60
+DEFAULT_MAX_SIZE = 10_000
+
+
+class MediaGroupStore:
+    """In-memory store: chat_id -> message ids with LRU eviction and TTL."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: int = DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # chat_id -> (created_at unix time, message ids)
+        self._items: OrderedDict[int, tuple[int, list[int]]] = OrderedDict()
+
+    async def load(self) -> None:
+        """Prepare the store at startup."""
+
+    async def set(self, chat_id: int, message_ids: list[int]) -> None:
+        self._items[chat_id] = (int(time.time()), list(message_ids))
+        self._items.move_to_end(chat_id)
+        while len(self._items) > self.max_size:
+            evicted, _ = self._items.popitem(last=False)
+            self._evicted(evicted)
+
+    def _evicted(self, chat_id: int) -> None:
+        """Called for a chat dropped from memory by the LRU limit."""
+
+    async def pop(self, chat_id: int) -> list[int]:
+        """Remove and return message ids of the chat; expired entries return []."""
+        item = self._items.pop(chat_id, None)
+        if item is None or item[0] <= int(time.time()) - self.ttl:
+            return []
+        return item[1]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SqliteMediaGroupStore(MediaGroupStore):
+    """
+    Memory store with write-through to media_group_messages. The DB is read only for chats
+    whose group is not in memory: stored before a restart or evicted by the LRU limit.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: int = DEFAULT_TTL):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self._on_disk: set[int] = set()
+
+    async def load(self) -> None:
+        cutoff = int(time.time()) - self.ttl
+        async with AsyncSessionLocal() as session:
+            await delete_media_groups_before(session, cutoff)
+            self._on_disk = set(await get_media_group_chat_ids(session, cutoff))
+        logger.info("Медиа-группы из БД: {} чатов", len(self._on_disk))
+
+    def _evicted(self, chat_id: int) -> None:
+        # группа вытеснена из памяти, но осталась в БД — pop должен найти её там
+        self._on_disk.add(chat_id)
+
+    async def set(self, chat_id: int, message_ids: list[int]) -> None:
+        await super().set(chat_id, message_ids)
+        self._on_disk.discard(chat_id)
+        try:
+            async with AsyncSessionLocal() as session:
+                await save_media_group(session, chat_id, message_ids, int(time.time()))
+        except Exception as e:
+            logger.debug("Не удалось сохранить медиа-группу в БД: {}", e)
+
+    async def pop(self, chat_id: int) -> list[int]:
+        in_memory = chat_id in self._items
+        ids = await super().pop(chat_id)
+        if not in_memory and chat_id not in self._on_disk:
+            return ids
+        self._on_disk.discard(chat_id)
+        try:
+            async with AsyncSessionLocal() as session:
+                stored = await pop_media_group(session, chat_id, int(time.time()) - self.ttl)
+        except Exception as e:
+            logger.debug("Не удалось прочитать медиа-группу из БД: {}", e)
+            stored = []
+        return ids or stored
+
+
+def create_media_group_store() -> MediaGroupStore:
+    """Store from env: MEDIA_GROUP_STORE=memory (default) | sqlite, MEDIA_GROUP_STORE_SIZE."""
+    kind = os.getenv("MEDIA_GROUP_STORE", "memory").strip().lower()
+    max_size = int(os.getenv("MEDIA_GROUP_STORE_SIZE", DEFAULT_MAX_SIZE))
+    if kind == "sqlite":
+        return SqliteMediaGroupStore(max_size=max_size)
+    return MediaGroupStore(max_size=max_size)
+
+
+media_group_store = create_media_group_store()
@@ -0,0 +1,160 @@
+"""
+Профилирование по запросу админа: фоновый поток снимает стек потока event loop каждые несколько
+миллисекунд, пока не истечёт время или не будет обработано заданное число обновлений. Результат —
+collapsed stacks (формат flamegraph.pl / speedscope) и список самых «горячих» функций.
+Пока профилирование выключено, ничего не работает, кроме проверки флага в middleware.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import BufferedInputFile, TelegramObject
+
+SAMPLE_INTERVAL = 0.005
+# ограничение сеанса в режиме «N обновлений», если обновлений мало
+MAX_DURATION = 300.0
+MAX_STACK_DEPTH = 128
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_APP_ROOT):
+        module = "app" + filename[len(_APP_ROOT) :].removesuffix(".py").replace(os.sep, ".")
+    else:
+        module = os.path.basename(filename).removesuffix(".py")
+    return f"{module}:{code.co_qualname}"
+
+
+@dataclass
+class Profile:
+    """Результат сеанса: число сэмплов по стекам (корень слева, через ';')."""
+
+    stacks: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+    updates: int = 0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 25) -> list[tuple[str, int, int]]:
+        """(function, self samples, total samples) sorted by self samples."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        return [(name, count, total[name]) for name, count in own.most_common(limit)]
+
+    def summary(self, limit: int = 25) -> str:
+        samples = self.samples or 1
+        lines = [
+            f"Профиль процесса {os.getpid()}: {self.duration:.1f} с, обновлений {self.updates}, сэмплов {self.samples}",
+            "",
+            f"{'self %':>7} {'total %':>8}  функция",
+        ]
+        for name, own, total in self.top(limit):
+            lines.append(f"{own * 100 / samples:7.1f} {total * 100 / samples:8.1f}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """One profiling session at a time; samples the thread that called run()."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.active = False
+        self._profile: Profile | None = None
+        self._updates_limit = 0
+        self._done: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _sample(self, thread_id: int, stop: threading.Event) -> None:
+        profile = self._profile
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            labels: list[str] = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                profile.stacks[";".join(reversed(labels))] += 1
+
+    def count_update(self) -> None:
+        profile = self._profile
+        if profile is None:
+            return
+        profile.updates += 1
+        if self._updates_limit and profile.updates >= self._updates_limit:
+            self._done.set()
+
+    async def run(self, seconds: float = 0, updates: int = 0) -> Profile:
+        """Profile the event loop thread for seconds or until updates are handled (capped by MAX_DURATION)."""
+        if self.active:
+            raise RuntimeError("profiling is already running")
+        self.active = True
+        self._profile = Profile()
+        self._updates_limit = updates
+        self._done = asyncio.Event()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, args=(threading.get_ident(), stop), name="profiler", daemon=True
+        )
+        start = time.monotonic()
+        sampler.start()
+        try:
+            timeout = min(seconds, MAX_DURATION) if seconds > 0 else MAX_DURATION
+            try:
+                await asyncio.wait_for(self._done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            profile = self._profile
+            profile.duration = time.monotonic() - start
+            self._profile = None
+            self.active = False
+        return profile
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilerMiddleware(BaseMiddleware):
+    """Outer update middleware: counts handled updates while a profiling session is running."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not profiler.active:
+            return await handler(event, data)
+        try:
+            return await handler(event, data)
+        finally:
+            profiler.count_update()
+
+
+def profile_document(profile: Profile) -> BufferedInputFile:
+    """Collapsed stacks as a document: open in speedscope.app or feed to flamegraph.pl."""
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    return BufferedInputFile(profile.collapsed().encode("utf-8"), filename=f"profile_{stamp}.folded")
@@ -0,0 +1,177 @@
+"""
+Переход между экранами меню с минимумом запросов к Bot API. Для каждого чата запоминается
+последний экран (хэш текста, картинки, клавиатура); выполняются только нужные операции,
+независимые — параллельно.
+"""
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InputMediaPhoto, Message
+from loguru import logger
+
+from app.utils.media_cache import photo_input, remember_photos
+from app.utils.media_groups import media_group_store
+
+MAX_SCREENS = 10_000
+
+
+@dataclass(slots=True)
+class Screen:
+    """Последний показанный экран чата."""
+
+    message_id: int
+    text_hash: int
+    image: str | None
+    keyboard: InlineKeyboardMarkup
+    group: tuple[str, ...]
+
+
+class ScreenRenderer:
+    """Renders menu screens as diffs against the chat's last screen (LRU of MAX_SCREENS chats)."""
+
+    def __init__(self, max_size: int = MAX_SCREENS):
+        self.max_size = max_size
+        self._screens: OrderedDict[int, Screen] = OrderedDict()
+
+    def _remember(self, chat_id: int, screen: Screen) -> None:
+        self._screens[chat_id] = screen
+        self._screens.move_to_end(chat_id)
+        while len(self._screens) > self.max_size:
+            self._screens.popitem(last=False)
+
+    async def render(
+        self,
+        bot: Bot,
+        msg: Message,
+        text: str,
+        images: list[str],
+        keyboard: InlineKeyboardMarkup,
+    ) -> int:
+        """Show the screen in place of msg. Returns the number of Bot API calls made."""
+        chat_id = msg.chat.id
+        prev = self._screens.pop(chat_id, None)
+        same_message = prev is not None and prev.message_id == msg.message_id
+        text_hash = hash(text)
+        unchanged = same_message and prev.text_hash == text_hash and prev.keyboard is keyboard
+        target_group = tuple(images) if len(images) > 1 else ()
+        keep_group = bool(target_group) and prev is not None and prev.group == target_group
+        calls = 0
+        message_id = msg.message_id
+        group_sent = keep_group
+
+        async def call(coro: Awaitable[Any]) -> Any:
+            nonlocal calls
+            calls += 1
+            return await coro
+
+        async def delete_group() -> None:
+            ids = await media_group_store.pop(chat_id)
+            if ids:
+                await call(bot.delete_messages(chat_id=chat_id, message_ids=ids))
+
+        # старая группа удаляется параллельно со всем остальным, но до записи id новой
+        deleting = None if keep_group else asyncio.ensure_future(delete_group())
+
+        async def send_group() -> None:
+            nonlocal group_sent
+            media_list = [InputMediaPhoto(media=await photo_input(src)) for src in target_group]
+            sent = await call(bot.send_media_group(chat_id=chat_id, media=media_list))
+            await remember_photos(list(target_group), sent)
+            if deleting is not None:
+                await asyncio.wait([deleting])
+            await media_group_store.set(chat_id, [m.message_id for m in sent])
+            group_sent = True
+
+        async def replace_message(send: Awaitable[Message]) -> Message:
+            nonlocal message_id
+            # удаление старого и отправка нового независимы
+            _, new = await asyncio.gather(
+                call(bot.delete_message(chat_id=chat_id, message_id=msg.message_id)),
+                call(send),
+            )
+            message_id = new.message_id
+            return new
+
+        async def send_text() -> None:
+            await replace_message(bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard))
+
+        ops: list[Awaitable[Any]] = [] if deleting is None else [deleting]
+
+        if len(images) == 1:
+            image = images[0]
+            if msg.photo:
+                if same_message and prev.image == image:
+                    if not unchanged:
+                        ops.append(call(bot.edit_message_caption(
+                            chat_id=chat_id,
+                            message_id=msg.message_id,
+                            caption=text,
+                            reply_markup=keyboard,
+                        )))
+                else:
+                    async def edit_media() -> None:
+                        result = await call(bot.edit_message_media(
+                            chat_id=chat_id,
+                            message_id=msg.message_id,
+                            media=InputMediaPhoto(media=await photo_input(image), caption=text),
+                            reply_markup=keyboard,
+                        ))
+                        await remember_photos([image], [result])
+
+                    ops.append(edit_media())
+            else:
+                async def send_photo() -> None:
+                    sent = await replace_message(bot.send_photo(
+                        chat_id=chat_id,
+                        photo=await photo_input(image),
+                        caption=text,
+                        reply_markup=keyboard,
+                    ))
+                    await remember_photos([image], [sent])
+
+                ops.append(send_photo())
+        else:
+            image = None
+            new_group = bool(target_group) and not keep_group
+            if msg.photo:
+                if new_group:
+                    # медиа-группа должна оказаться над сообщением с текстом
+                    async def group_then_text() -> None:
+                        await send_group()
+                        await send_text()
+
+                    ops.append(group_then_text())
+                else:
+                    ops.append(send_text())
+            else:
+                if new_group:
+                    ops.append(send_group())
+                if not unchanged:
+                    ops.append(call(msg.edit_text(text=text, reply_markup=keyboard)))
+
+        results = await asyncio.gather(*ops, return_exceptions=True)
+        for result in results:
+            if isinstance(result, TelegramBadRequest) and "message is not modified" in result.message:
+                continue
+            if isinstance(result, Exception):
+                logger.error("Не удалось обновить сообщение меню: {}", result)
+        self._remember(
+            chat_id,
+            Screen(
+                message_id=message_id,
+                text_hash=text_hash,
+                image=image,
+                keyboard=keyboard,
+                group=target_group if group_sent else (),
+            ),
+        )
+        logger.debug("Экран меню: chat_id={}, запросов к API: {}", chat_id, calls)
+        return calls
+
+
+screen_renderer = ScreenRenderer()
@@ -0,0 +1,90 @@
+"""
+Счётчики пользователей для админ панели: хранятся в таблицах user_stats (всего) и deep_link_daily
+(по дням), читаются из памяти.
+"""
+import asyncio
+from datetime import datetime
+
+from loguru import logger
+
+from app.database.crud.stats import (
+    get_deep_link_periods,
+    get_user_stats,
+    rebuild_deep_link_daily,
+    rebuild_user_stats,
+)
+from app.database.db_session import AsyncSessionLocal
+
+# Раз в столько секунд счётчики пересчитываются по таблице users
+RECONCILE_INTERVAL = 6 * 60 * 60
+# Раз в столько секунд счётчики перечитываются из таблицы (их пополняют и другие процессы бота)
+REFRESH_INTERVAL = 10
+
+
+class UserStats:
+    """In-memory copy of user_stats and deep_link_daily: totals and today/7/30-day counts per deep link."""
+
+    def __init__(self) -> None:
+        self._counts: dict[str | None, int] = {}
+        # deep_link -> (сегодня, 7 дней, 30 дней), дни по UTC
+        self._periods: dict[str | None, tuple[int, int, int]] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def total(self) -> int:
+        return sum(self._counts.values())
+
+    def by_deep_link(self) -> list[tuple[str | None, int]]:
+        """(deep_link, count), без ссылки — первым."""
+        return sorted(self._counts.items(), key=lambda item: (item[0] is not None, item[0] or ""))
+
+    def periods(self, deep_link: str | None) -> tuple[int, int, int]:
+        """Новые пользователи по ссылке: сегодня, за 7 и за 30 дней."""
+        return self._periods.get(deep_link, (0, 0, 0))
+
+    async def refresh(self) -> None:
+        """Перечитать счётчики из таблиц (несколько строк, дневные — за 30 дней)."""
+        async with AsyncSessionLocal() as session:
+            rows = await get_user_stats(session)
+            periods = await get_deep_link_periods(session, datetime.utcnow().date())
+        self._counts = dict(rows)
+        self._periods = {deep_link: (day, week, month) for deep_link, day, week, month in periods}
+
+    async def reconcile(self) -> None:
+        """Пересчитать счётчики по таблице users и перечитать их."""
+        async with AsyncSessionLocal() as session:
+            await rebuild_user_stats(session)
+            await rebuild_deep_link_daily(session)
+        await self.refresh()
+        logger.info("Счётчики пользователей пересчитаны: всего {}", self.total)
+
+    def start(self, reconcile: bool = True) -> None:
+        """Запустить периодическое обновление (и, если reconcile, сверку) счётчиков."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(reconcile))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self, reconcile: bool) -> None:
+        loop = asyncio.get_running_loop()
+        next_reconcile = loop.time() + RECONCILE_INTERVAL
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                if reconcile and loop.time() >= next_reconcile:
+                    next_reconcile = loop.time() + RECONCILE_INTERVAL
+                    await self.reconcile()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.error("Не удалось обновить счётчики пользователей: {}", e)
+
+
+user_stats = UserStats()
@@ -0,0 +1,161 @@
+"""Регистрация пользователей без ожидания БД: индекс известных пользователей в памяти и пакетная запись в фоне."""
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from datetime import date, datetime
+
+from loguru import logger
+
+from app.database.crud.stats import increment_deep_link_daily, increment_user_stats
+from app.database.crud.user import get_known_users, insert_new_users, reactivate_users, upsert_users
+from app.database.db_session import AsyncSessionLocal
+from app.utils.stats import user_stats
+
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH_SIZE = 500
+
+
+class UserRegistry:
+    """
+    Known-user index (telegram_id -> username), warmed at startup. New users and changed
+    usernames are queued and written in batches with INSERT ... ON CONFLICT DO UPDATE;
+    user_stats counters and the deep_link_daily rollup are incremented in the same flush, only for users
+    the INSERT actually created: with several processes the index holds only the process shard, and /start
+    in a group chat reaches the group's shard, where a known user looks new.
+    Known users who send /start again are reactivated in the same flush if a broadcast marked them
+    blocked/deactivated (the mark may come from another process, so it is checked in the DB).
+    """
+
+    def __init__(self) -> None:
+        self._known: dict[int, str | None] = {}
+        # telegram_id -> строка для upsert; повторный /start до записи перезаписывает строку
+        self._pending: dict[int, dict] = {}
+        # telegram_id из _pending, которых ещё нет в БД (учитываются в счётчиках user_stats)
+        self._new: set[int] = set()
+        # известные telegram_id, приславшие /start с прошлой записи
+        self._returning: set[int] = set()
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    async def warm(self, owns: Callable[[int], bool] | None = None) -> None:
+        """Загрузить пользователей из БД в индекс; owns — только свои (при нескольких процессах)."""
+        async with AsyncSessionLocal() as session:
+            rows = await get_known_users(session)
+        self._known = {tid: username for tid, username in rows if owns is None or owns(tid)}
+        logger.info("Индекс пользователей загружен: {}", len(self._known))
+
+    def register(self, telegram_id: int, username: str | None, deep_link: str | None = None) -> bool:
+        """Учесть /start без обращения к БД. Returns True if the user is new."""
+        if telegram_id in self._known:
+            self._returning.add(telegram_id)
+            if username is None or self._known[telegram_id] == username:
+                self._notify()
+                return False
+            self._known[telegram_id] = username
+            pending = self._pending.get(telegram_id)
+            if pending is not None:
+                pending["username"] = username
+            else:
+                self._pending[telegram_id] = {
+                    "telegram_id": telegram_id,
+                    "username": username,
+                    "deep_link": None,
+                    "created_at": datetime.utcnow(),
+                }
+            self._notify()
+            return False
+        self._known[telegram_id] = username
+        self._pending[telegram_id] = {
+            "telegram_id": telegram_id,
+            "username": username,
+            "deep_link": deep_link,
+            "created_at": datetime.utcnow(),
+        }
+        self._new.add(telegram_id)
+        self._notify()
+        return True
+
+    def _notify(self) -> None:
+        if len(self._pending) >= FLUSH_BATCH_SIZE or len(self._returning) >= FLUSH_BATCH_SIZE:
+            self._wake.set()
+
+    def start(self) -> None:
+        """Запустить фоновую запись очереди."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу и записать оставшуюся очередь."""
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while self._pending or self._returning:
+            if not await self.flush():
+                break
+
+    async def flush(self) -> bool:
+        """Записать очередь в БД одним пакетом. При ошибке строки возвращаются в очередь."""
+        if not self._pending and not self._returning:
+            return True
+        rows = list(self._pending.values())[:FLUSH_BATCH_SIZE]
+        returning, self._returning = self._returning, set()
+        increments: Counter[str | None] = Counter()
+        daily: Counter[tuple[date, str | None]] = Counter()
+        new_ids: list[int] = []
+        for row in rows:
+            del self._pending[row["telegram_id"]]
+            if row["telegram_id"] in self._new:
+                self._new.discard(row["telegram_id"])
+                new_ids.append(row["telegram_id"])
+        try:
+            async with AsyncSessionLocal() as session:
+                inserted = await insert_new_users(session, [row for row in rows if row["telegram_id"] in new_ids])
+                await upsert_users(session, [row for row in rows if row["telegram_id"] not in inserted])
+                for row in rows:
+                    if row["telegram_id"] in inserted:
+                        increments[row["deep_link"]] += 1
+                        daily[(row["created_at"].date(), row["deep_link"])] += 1
+                await increment_user_stats(session, increments)
+                await increment_deep_link_daily(session, daily)
+                # «новые» для этого процесса, но уже записанные в БД — вернувшиеся пользователи
+                returned = returning | (set(new_ids) - inserted)
+                reactivated = await reactivate_users(session, returned) if returned else 0
+                # одна транзакция на запись: при ошибке ничего не применено и повтор не удвоит счётчики
+                await session.commit()
+        except Exception as e:
+            logger.error("Не удалось записать {} пользователей в БД: {}", len(rows), e)
+            for row in rows:
+                newer = self._pending.get(row["telegram_id"])
+                if newer is None:
+                    self._pending[row["telegram_id"]] = row
+                else:
+                    newer["deep_link"] = row["deep_link"]
+                    newer["created_at"] = row["created_at"]
+            self._new.update(new_ids)
+            self._returning |= returning
+            return False
+        if rows:
+            logger.debug("Записано пользователей в БД: {}", len(rows))
+        if reactivated:
+            logger.info("Пользователей снова активны (вернулись через /start): {}", reactivated)
+        if increments:
+            await user_stats.refresh()
+        return True
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._pending or self._returning:
+                if not await self.flush():
+                    break
+
+
+user_registry = UserRegistry()
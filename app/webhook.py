@@ -0,0 +1,59 @@
+"""Режим webhook: aiohttp-сервер вместо long polling (BOT_MODE=webhook)."""
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+
+from app.core.config_aiogram import config_aiogram
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Serve updates over HTTP until cancelled. Each request is handled in its own task; a Bot API
+    method returned by a handler (e.g. callback.answer()) goes back in the webhook response.
+    With WEBHOOK_URL set the webhook is registered on startup and removed on shutdown;
+    without it the server only accepts updates POSTed to it (local testing).
+    """
+    settings = config_aiogram.webhook
+    secret = settings.secret_token()
+
+    async def on_startup() -> None:
+        if not settings.url:
+            logger.warning("WEBHOOK_URL не задан: webhook в Telegram не регистрируется")
+            return
+        await bot.set_webhook(
+            url=settings.url + settings.path,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=settings.max_connections,
+        )
+        logger.info("Webhook зарегистрирован: {}", settings.url + settings.path)
+
+    async def on_shutdown() -> None:
+        if settings.url:
+            await bot.delete_webhook()
+            logger.info("Webhook удалён")
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        handle_in_background=False,
+    ).register(app, path=settings.path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.host, port=settings.port)
+    await site.start()
+    logger.info("Бот принимает webhook на {}:{}{}", settings.host, settings.port, settings.path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
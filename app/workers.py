@@ -0,0 +1,240 @@
+"""
+Несколько процессов-обработчиков (BOT_WORKERS > 1). Главный процесс получает обновления
+(long polling или webhook) и отправляет каждое в процесс-обработчик по chat_id % N: обновления
+одного чата всегда обрабатывает один и тот же процесс и строго по порядку.
+"""
+import asyncio
+import hmac
+import multiprocessing
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from aiohttp import web
+from loguru import logger
+
+from app.core.config_aiogram import config_aiogram
+
+POLLING_TIMEOUT = 30
+MONITOR_INTERVAL = 5.0
+POLLING_BACKOFF = BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1)
+
+
+def shard_of(chat_id: int, count: int) -> int:
+    return chat_id % count
+
+
+def update_chat_id(update: dict[str, Any]) -> int:
+    """chat_id обновления (для callback и inline — id пользователя); 0, если не найден."""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        message = event.get("message")
+        chat = event.get("chat") or (message.get("chat") if isinstance(message, dict) else None)
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+        user = event.get("from") or event.get("user")
+        if isinstance(user, dict) and "id" in user:
+            return int(user["id"])
+    return 0
+
+
+# --- процесс-обработчик ---
+
+
+def worker_main(index: int, count: int, queue: Queue) -> None:
+    """Entry point of a worker process."""
+    asyncio.run(_worker(index, count, queue))
+
+
+async def _worker(index: int, count: int, queue: Queue) -> None:
+    from app.bot import create_dispatcher, start_metrics, start_services, stop_services
+    from app.core.config_aiogram import aiogram_bot
+    from app.core.logging_config import setup_logging
+    from app.data.deep_links_loader import load_deep_links
+    from app.data.loader import load_sections
+
+    setup_logging()
+    load_sections()
+    load_deep_links()
+    dp = create_dispatcher()
+    await start_metrics(dp, port_offset=index)
+    await start_services(primary=index == 0, owns_chat=lambda chat_id: shard_of(chat_id, count) == index)
+    logger.info("Обработчик #{} из {} запущен", index, count)
+
+    loop = asyncio.get_running_loop()
+    tasks: set[asyncio.Task] = set()
+
+    async def handle(update: dict[str, Any]) -> None:
+        # порядок обновлений одного чата соблюдает UpdateLanesMiddleware
+        try:
+            result = await dp.feed_raw_update(aiogram_bot, update)
+            # метод, возвращённый обработчиком (например, callback.answer()), выполняется здесь,
+            # как Dispatcher при polling (call_answer=True)
+            if isinstance(result, TelegramMethod):
+                await aiogram_bot(result)
+        except Exception as e:
+            logger.exception("Ошибка обработки обновления {}: {}", update.get("update_id"), e)
+
+    try:
+        while True:
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                break
+            task = asyncio.create_task(handle(update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await stop_services()
+        await aiogram_bot.session.close()
+        logger.info("Обработчик #{} остановлен", index)
+        await logger.complete()
+
+
+# --- главный процесс ---
+
+
+class Supervisor:
+    """Запускает N процессов-обработчиков и раскладывает по ним обновления."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues: list[Queue] = [self._ctx.Queue() for _ in range(count)]
+        self._processes: list[multiprocessing.Process | None] = [None] * count
+
+    def _spawn(self, index: int) -> None:
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(index, self.count, self._queues[index]),
+            name=f"bot-worker-{index}",
+            daemon=False,
+        )
+        process.start()
+        self._processes[index] = process
+
+    def start(self) -> None:
+        for index in range(self.count):
+            self._spawn(index)
+
+    def route(self, update: dict[str, Any]) -> None:
+        self._queues[shard_of(update_chat_id(update), self.count)].put(update)
+
+    async def monitor(self) -> None:
+        """Перезапустить упавший процесс (его очередь сохраняется)."""
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.error("Обработчик #{} завершился (код {}), перезапуск", index, process.exitcode)
+                    self._spawn(index)
+
+    async def stop(self) -> None:
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            if process is not None:
+                await asyncio.to_thread(process.join)
+
+
+async def _poll_updates(bot: Bot, supervisor: Supervisor, allowed_updates: list[str]) -> None:
+    offset: int | None = None
+    # как Dispatcher.start_polling: любая ошибка — пауза с растущей задержкой, цикл не прерывается
+    backoff = Backoff(config=POLLING_BACKOFF)
+    logger.info("Бот запускает long polling ({} обработчиков)", supervisor.count)
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset,
+                timeout=POLLING_TIMEOUT,
+                allowed_updates=allowed_updates,
+                request_timeout=POLLING_TIMEOUT + 10,
+            )
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        except TelegramNetworkError as e:
+            logger.warning("Ошибка получения обновлений: {}; повтор через {:.1f} с", e, backoff.next_delay)
+            await backoff.asleep()
+            continue
+        except Exception as e:
+            logger.exception("Ошибка получения обновлений: {}; повтор через {:.1f} с", e, backoff.next_delay)
+            await backoff.asleep()
+            continue
+        backoff.reset()
+        for update in updates:
+            supervisor.route(update.model_dump(mode="json", exclude_unset=True))
+            offset = update.update_id + 1
+
+
+async def _serve_webhook(bot: Bot, supervisor: Supervisor, allowed_updates: list[str]) -> None:
+    settings = config_aiogram.webhook
+    secret = settings.secret_token()
+
+    async def handle(request: web.Request) -> web.Response:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token, secret):
+            return web.Response(body="Unauthorized", status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(body="Bad Request", status=400)
+        if not isinstance(update, dict):
+            return web.Response(body="Bad Request", status=400)
+        supervisor.route(update)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(settings.path, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=settings.host, port=settings.port).start()
+    if settings.url:
+        await bot.set_webhook(
+            url=settings.url + settings.path,
+            secret_token=secret,
+            allowed_updates=allowed_updates,
+            max_connections=settings.max_connections,
+        )
+        logger.info("Webhook зарегистрирован: {}", settings.url + settings.path)
+    else:
+        logger.warning("WEBHOOK_URL не задан: webhook в Telegram не регистрируется")
+    logger.info(
+        "Бот принимает webhook на {}:{}{} ({} обработчиков)",
+        settings.host,
+        settings.port,
+        settings.path,
+        supervisor.count,
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if settings.url:
+            await bot.delete_webhook()
+        await runner.cleanup()
+
+
+async def run_supervisor(count: int) -> None:
+    """Run the receiving process with count worker processes until cancelled."""
+    from app.bot import create_dispatcher
+    from app.core.config_aiogram import aiogram_bot
+
+    allowed_updates = create_dispatcher().resolve_used_update_types()
+    supervisor = Supervisor(count)
+    supervisor.start()
+    monitor = asyncio.create_task(supervisor.monitor())
+    try:
+        if config_aiogram.webhook.enabled:
+            await _serve_webhook(aiogram_bot, supervisor, allowed_updates)
+        else:
+            await aiogram_bot.delete_webhook()
+            await _poll_updates(aiogram_bot, supervisor, allowed_updates)
+    finally:
+        monitor.cancel()
+        await supervisor.stop()
+        await aiogram_bot.session.close()
@@ -0,0 +1,257 @@
+"""
+Микробенчмарки горячих путей: поиск в контенте, клавиатуры меню, список пользователей, CRUD на SQLite.
+Работают без сети и без настоящего токена; база — временный файл.
+
+    python -m benchmarks                          # все, результат JSON в stdout
+    python -m benchmarks -k content -o new.json   # только имена с "content", в файл
+    python -m benchmarks --compare old.json       # сравнить с прошлым прогоном
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+# до импорта app: конфиг требует токен, движок БД создаётся при импорте
+_DB_DIR = tempfile.mkdtemp(prefix="bot-bench-")
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/bench.db"
+
+from loguru import logger  # noqa: E402
+
+from app.data import loader  # noqa: E402
+from app.database import init_db  # noqa: E402
+from app.database.crud.user import get_or_create_user, get_users_count_by_deep_link  # noqa: E402
+from app.database.db_session import AsyncSessionLocal  # noqa: E402
+from app.handlers.admin import _format_users_chunks  # noqa: E402
+from app.keyboards.main_kb import build_menu_keyboard, get_menu_keyboard  # noqa: E402
+
+REPEAT = 5
+
+
+class Bench:
+    def __init__(self, name: str, params: dict[str, Any]):
+        self.name = name
+        self.params = params
+
+
+def _result(bench: Bench, ops: int, timings: list[float]) -> dict[str, Any]:
+    best = min(timings)
+    return {
+        "name": bench.name,
+        "params": bench.params,
+        "ops": ops,
+        "repeat": len(timings),
+        "min_s": best,
+        "median_s": statistics.median(timings),
+        "per_op_us": best / ops * 1e6,
+    }
+
+
+def measure(bench: Bench, func: Callable[[], Any], ops: int, repeat: int = REPEAT) -> dict[str, Any]:
+    """Call func ops times per round; best of repeat rounds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(ops):
+            func()
+        timings.append(time.perf_counter() - start)
+    return _result(bench, ops, timings)
+
+
+async def measure_async(
+    bench: Bench, func: Callable[[], Awaitable[Any]], ops: int, repeat: int = REPEAT
+) -> dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(ops):
+            await func()
+        timings.append(time.perf_counter() - start)
+    return _result(bench, ops, timings)
+
+
+# --- синтетический контент ---
+
+
+def make_tree(depth: int, width: int) -> dict[str, Any]:
+    """sections.yaml-like content: width children per node, depth levels."""
+
+    def children(prefix: str, level: int) -> list[dict[str, Any]]:
+        if level == depth:
+            return []
+        return [
+            {
+                "id": f"{prefix}{i}",
+                "title": f"Раздел {prefix}{i}",
+                "text": f"Текст раздела {prefix}{i}. " * 5,
+                "images": [f"https://example.com/{prefix}{i}.jpg"],
+                "children": children(f"{prefix}{i}_", level + 1),
+            }
+            for i in range(width)
+        ]
+
+    return {"welcome": {"text": "Добро пожаловать"}, "sections": children("", 0), "info": {"text": "О нас"}}
+
+
+def bench_content() -> list[dict[str, Any]]:
+    results = []
+    for shape, depth, width in (("deep", 10, 2), ("wide", 2, 40)):
+        content = make_tree(depth, width)
+        params = {"shape": shape, "depth": depth, "width": width}
+        snapshot = loader.compile_content(content)
+        compile_bench = Bench("content.compile", {**params, "nodes": len(snapshot.nodes)})
+        results.append(measure(compile_bench, lambda: loader.compile_content(content), 1))
+        loader.set_snapshot(snapshot)
+        # самый глубокий/последний путь — худший случай для поиска обходом дерева
+        path = max(snapshot.nodes, key=lambda p: (p.count("_"), p))
+        results.append(
+            measure(Bench("content.get_text_for_path", params), lambda: loader.get_text_for_path(path), 100_000)
+        )
+        results.append(
+            measure(Bench("content.get_images_for_path", params), lambda: loader.get_images_for_path(path), 100_000)
+        )
+        results.append(
+            measure(
+                Bench("content.get_children_for_path", params), lambda: loader.get_children_for_path(""), 10_000
+            )
+        )
+    return results
+
+
+def bench_keyboards() -> list[dict[str, Any]]:
+    results = []
+    for count in (10, 100, 300):
+        loader.set_snapshot(loader.compile_content(make_tree(1, count)))
+        params = {"children": count}
+        results.append(
+            measure(Bench("keyboard.get_menu_keyboard", params), lambda: get_menu_keyboard("", False), 10_000)
+        )
+        buttons = [(f"{i}", f"Раздел {i}") for i in range(count)]
+        results.append(
+            measure(
+                Bench("keyboard.build_menu_keyboard", params),
+                lambda: build_menu_keyboard("", buttons, "", is_admin=True),
+                max(1, 1000 // count),
+            )
+        )
+    return results
+
+
+def bench_users_list() -> list[dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    users = [
+        SimpleNamespace(
+            id=i,
+            telegram_id=100_000_000 + i,
+            username=f"user{i}" if i % 3 else None,
+            created_at=now - timedelta(minutes=i),
+            deep_link=f"link{i % 20}" if i % 2 else None,
+        )
+        for i in range(100_000)
+    ]
+    bench = Bench("admin.format_users_chunks", {"users": len(users)})
+    return [measure(bench, lambda: _format_users_chunks(users), 1)]
+
+
+async def bench_crud() -> list[dict[str, Any]]:
+    await init_db()
+    results = []
+    telegram_ids = iter(range(1, 10**9))
+
+    async def create() -> None:
+        async with AsyncSessionLocal() as session:
+            user_id = next(telegram_ids)
+            await get_or_create_user(session, user_id, f"user{user_id}", deep_link=f"link{user_id % 20}")
+
+    results.append(await measure_async(Bench("crud.get_or_create_user.create", {}), create, 200))
+
+    async def existing() -> None:
+        async with AsyncSessionLocal() as session:
+            await get_or_create_user(session, 1, "user1")
+
+    results.append(await measure_async(Bench("crud.get_or_create_user.existing", {}), existing, 500))
+
+    async def count() -> None:
+        async with AsyncSessionLocal() as session:
+            await get_users_count_by_deep_link(session)
+
+    async with AsyncSessionLocal() as session:
+        links = await get_users_count_by_deep_link(session)
+    params = {"users": sum(n for _, n in links), "links": len(links)}
+    results.append(await measure_async(Bench("crud.get_users_count_by_deep_link", params), count, 50))
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict[str, Any]], baseline_path: Path) -> None:
+    """Print per_op ratio against a previous run to stderr (>1 — slower now)."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    old = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    for r in results:
+        prev = old.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if prev is None:
+            continue
+        ratio = r["per_op_us"] / prev["per_op_us"] if prev["per_op_us"] else float("inf")
+        print(f"{ratio:6.2f}x  {r['name']} {r['params']}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[1])
+    parser.add_argument("-k", dest="keyword", default="", help="run only benchmarks whose group contains this")
+    parser.add_argument("-o", "--output", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="previous JSON result to compare with")
+    args = parser.parse_args()
+    logger.remove()
+
+    groups: dict[str, Callable[[], list[dict[str, Any]]]] = {
+        "content": bench_content,
+        "keyboard": bench_keyboards,
+        "admin": bench_users_list,
+        "crud": lambda: asyncio.run(bench_crud()),
+    }
+    results: list[dict[str, Any]] = []
+    for group, run in groups.items():
+        if args.keyword in group:
+            results.extend(run())
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()